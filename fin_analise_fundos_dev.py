@@ -28,8 +28,27 @@ import plotly.graph_objects as go
 import plotly.offline as py
 import seaborn as sns
 
+from fin_cache import abre
+from fin_cvm import ConsultaInformes, DatasetInformes, carrega_cadastro, carrega_informes
+from fin_indices import (IndiceAtributos, IndiceFundos, IndiceNomes, MatrizQuotas,
+                         chave_para_cnpj)
+from fin_janelas import JanelasMoveis, LogQuotas
+from fin_ranking import (METRICAS, EstadoClassificacao, classifica_todos, extremos,
+                         junta_cadastro, memoriza, metricas_risco, retornos_matriz,
+                         retornos_periodo, versao_serie)
+from fin_retornos import Retornos, apresenta
+
 pd.options.plotting.backend = 'plotly'
 
+# colunas dos informes usadas por cada consulta
+COLUNAS_VALORES_DIARIOS = ['CNPJ_FUNDO', 'DT_COMPTC', 'VL_QUOTA']
+COLUNAS_CLASSIFICACAO = ['CNPJ_FUNDO', 'DT_COMPTC', 'VL_QUOTA', 'NR_COTST']
+
+# nomes curtos das classes usadas na classificacao, outras classes podem ser
+# informadas pelo nome do cadastro
+CLASSES = {'acoes': 'Fundo de Ações', 'multimercado': 'Fundo Multimercado',
+           'rendafixa': 'Fundo de Renda Fixa', 'cambial': 'Fundo Cambial'}
+
 # funcao consulta banco central cdi codigo 12
 
 def consulta_bcb(codigo_bcb, data_inicio, data_fim):
@@ -62,7 +81,7 @@ def consulta_bcb(codigo_bcb, data_inicio, data_fim):
     url = "http://api.bcb.gov.br/dados/serie/bcdata.sgs.{}/dados?formato=csv".format(
         codigo_bcb)
     df = pd.read_csv(
-        url, parse_dates=True, dayfirst=True, index_col="data", sep=";", decimal=",")
+        abre(url), parse_dates=True, dayfirst=True, index_col="data", sep=";", decimal=",")
     df.index = pd.to_datetime(df.index, format="%Y/%m/%d")
     df = df[data_inicio:data_fim]
     return df
@@ -121,34 +140,21 @@ def consulta_cvm_cadastro():
 
     Returns
     -------
-    Pandas DataFrame com os dados dos fundos
+    Pandas DataFrame com os dados dos fundos em funcionamento
 
     """
 
-    url = "http://dados.cvm.gov.br/dados/FI/CAD/DADOS/cad_fi.csv"
-
     try:
 
-        cadastro = pd.read_csv(
-            url, sep=";", encoding="ISO-8859-1", dtype="unicode")
+        # seleciona fundos em funcionamemto e as colunas nescessarias
+        cadastro = carrega_cadastro(
+            ["DENOM_SOCIAL", "SIT", "TP_FUNDO", "CLASSE", "VL_PATRIM_LIQ", "ADMIN", "GESTOR"],
+            ativos=True)
 
-    except:
+    except Exception:
         print("Arquivo de dados não encontrado!")
         print("Verificar URL da CVM")
-
-    # seleciona fundos em funcionamemto # problema com fundos encerrados
-    cadastro = cadastro[
-        cadastro["SIT"].isin(
-            ["EM FUNCIONAMENTO NORMAL", "FASE PRÉ-OPERACIONAL"])
-    ]
-
-    # seleciona as colunas nescessarias
-    cadastro = cadastro.loc[
-        :, ["CNPJ_FUNDO", "DENOM_SOCIAL", "SIT", "TP_FUNDO", "CLASSE", "VL_PATRIM_LIQ"]
-    ].set_index("CNPJ_FUNDO", drop=True)
-
-    # retira duplicados
-    cadastro.drop_duplicates(inplace=True)
+        raise
 
     return cadastro
 
@@ -166,21 +172,14 @@ def consulta_cvm_cadastro_completo():
 
     """
 
-    url = "http://dados.cvm.gov.br/dados/FI/CAD/DADOS/cad_fi.csv"
-
     try:
 
-        cadastro = pd.read_csv(
-            url, sep=";", encoding="ISO-8859-1", dtype="unicode")
+        cadastro = carrega_cadastro()
 
-    except:
+    except Exception:
         print("Arquivo de dados não encontrado!")
         print("Verificar URL da CVM")
-
-    cadastro.set_index("CNPJ_FUNDO", drop=True, inplace=True)
-
-    # retira duplicados
-    cadastro.drop_duplicates(inplace=True)
+        raise
 
     return cadastro
 
@@ -211,22 +210,8 @@ def consulta_cvm_informes(data_inicio, data_fim):
     data_inicio = pd.to_datetime(
         data_inicio, format="%Y/%m/%d") - pd.DateOffset(months=1)
 
-    # datas de solicitacao dos arquivos
-    datas = pd.date_range(data_inicio, data_fim, freq="MS")
-
-    informe_completo = pd.DataFrame()
-    for data in datas:
-        try:
-            url = "http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/inf_diario_fi_{}{:02d}.zip".format(
-                data.year, data.month)
-            informe_mensal = pd.read_csv(url, sep=";")
-
-        except:
-            print("Arquivo {} não encontrado!".format(url))
-            print("Forneça outra data!")
-
-        informe_completo = pd.concat(
-            [informe_completo, informe_mensal], ignore_index=True)
+    # meses lidos do armazenamento local, somente os ausentes sao baixados
+    informe_completo = carrega_informes(data_inicio, data_fim)
 
     return informe_completo
 
@@ -247,32 +232,18 @@ def consulta_cvm_informes_upgrade(data_inicio, data_fim):
     Returns
     -------
     Pandas DataFrame com as informacoes mensais de rendimento dos fundos
-    no periodo solitado
+    no periodo solitado, sem duplicados. O dataset e gravado e pode ser lido
+    depois com DatasetInformes.carrega()
 
     """
 
-    # datas de solicitacao dos arquivos
-    datas = pd.date_range(data_inicio, data_fim, freq="MS")
-
-    informe_completo = pd.DataFrame()
-    for data in datas:
-        try:
-            url = "http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/inf_diario_fi_{}{:02d}.zip".format(
-                data.year, data.month)
-            informe_mensal = pd.read_csv(url, sep=";")
-
-        except:
-            print("Arquivo {} não encontrado!".format(url))
-            print("Forneça outra data!")
-
-        informe_completo = pd.concat(
-            [informe_completo, informe_mensal], ignore_index=True)
-
-    informes_2023 = pd.read_csv('informes_2023.csv').drop('Unnamed: 0', axis=1)
-    informe_upgrade = pd.concat(
-        [informes_2023, informe_completo], ignore_index=True)
+    # dados da cvm tem prioridade sobre o arquivo gravado
+    dataset = DatasetInformes()
+    dataset.adiciona_csv('informes_2023.csv')
+    dataset.adiciona_cvm(data_inicio, data_fim)
+    dataset.grava()
 
-    return informe_upgrade
+    return dataset.informes
 
 
 def consulta_cvm_informes_zip():
@@ -291,17 +262,17 @@ def consulta_cvm_informes_zip():
     Returns
     -------
     Pandas DataFrame com as informacoes mensais de rendimento dos fundos
-    no periodo solitado
+    no periodo solitado, sem duplicados. O dataset e gravado e pode ser lido
+    depois com DatasetInformes.carrega()
 
     """
 
+    dataset = DatasetInformes()
+    dataset.adiciona_csv('informes_abr22.csv')
+    dataset.adiciona_csv('informes.csv')
+    dataset.grava()
 
-    informes_abr22 = pd.read_csv('informes_abr22.csv').drop('Unnamed: 0', axis=1)
-    informes = pd.read_csv('informes.csv', sep=",")
-    informe_upgrade = pd.concat(
-        [informes_abr22, informes], ignore_index=True)
-
-    return informe_upgrade
+    return dataset.informes
 
 
 
@@ -321,18 +292,18 @@ def consulta_cvm_informes_mes(ano, mes):
     -------
     Pandas DataFrame com as informacoes mensais de rendimento dos fundos
     """
-    try:
-        url = 'http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/inf_diario_fi_{}{:02d}.zip'.format(
-            ano, mes)
-        return pd.read_csv(url, sep=';')
-    except:
+    data = '{}-{:02d}'.format(ano, mes)
+    informe_mensal = carrega_informes(data, data)
+    if informe_mensal.empty:
         print('Arquivo de dados não encontrado!')
         print('Verificar data informada')
+        return None
+    return informe_mensal
 
 
 # consulta fundos por cnpj com totalizacao de retornos
 
-def consulta_fundos_total(cnpj):
+def consulta_fundos_total(cnpj, informes, cadastro, data_inicio=None, data_fim=None):
     """
 
     Consulta fundos pelo CNPJ na base de dados da CVM
@@ -342,24 +313,41 @@ def consulta_fundos_total(cnpj):
     cnpj: list
           lista com os cnpj solicitados em forma de lista
 
+    informes : DataFrame
+               informes diarios com CNPJ_FUNDO, DT_COMPTC e VL_QUOTA
+
+    cadastro : DataFrame
+               cadastro dos fundos com CNPJ_FUNDO no index
+
+    data_inicio : data
+                  YYYY-MM-DD, se None desde o primeiro informe
+
+    data_fim : data
+               YYYY-MM-DD, se None ate o ultimo informe
+
     Returns
     -------
     Pandas DataFrame com os cnpj escolhidos
 
     """
 
-    fundos = pd.DataFrame()
-
-    for cnpj in cnpj:
-        fundo = informes[informes["CNPJ_FUNDO"] == cnpj].set_index("DT_COMPTC")
-        fundo = fundo.loc[data_inicio:data_fim]
-        fundo = fundo["VL_QUOTA"] / fundo["VL_QUOTA"].iloc[0]
-        fundos.loc[cnpj, "Retorno(%)"] = round((fundo.iloc[-1] - 1) * 100, 2)
-        fundos.loc[cnpj, "Nome"] = [cadastro.loc[cnpj, "DENOM_SOCIAL"]]
-        fundos.loc[cnpj, "Tipo"] = [cadastro.loc[cnpj, "TP_FUNDO"]]
-        fundos.loc[cnpj, "Classe"] = [cadastro.loc[cnpj, "CLASSE"]]
-        fundos.loc[cnpj, "PL"] = [cadastro.loc[cnpj, "VL_PATRIM_LIQ"]]
-        fundos.loc[cnpj, "Situacao"] = [cadastro.loc[cnpj, "SIT"]]
+    sel_fundos = informes[informes["CNPJ_FUNDO"].isin(cnpj)]
+    if data_inicio is not None:
+        sel_fundos = sel_fundos[sel_fundos["DT_COMPTC"] >= pd.to_datetime(data_inicio)]
+    if data_fim is not None:
+        sel_fundos = sel_fundos[sel_fundos["DT_COMPTC"] <= pd.to_datetime(data_fim)]
+
+    # primeira e ultima quota de cada fundo no periodo
+    quotas = (sel_fundos.sort_values(["CNPJ_FUNDO", "DT_COMPTC"], kind="stable")
+              .groupby("CNPJ_FUNDO", observed=True)["VL_QUOTA"].agg(["first", "last"]))
+    quotas.index = quotas.index.astype(str)
+
+    fundos = pd.DataFrame(
+        {"Retorno(%)": round((quotas["last"] / quotas["first"] - 1) * 100, 2)})
+    fundos = fundos.merge(
+        cadastro[["DENOM_SOCIAL", "TP_FUNDO", "CLASSE", "VL_PATRIM_LIQ", "SIT"]]
+        .set_axis(["Nome", "Tipo", "Classe", "PL", "Situacao"], axis=1),
+        how="left", left_index=True, right_index=True)
     return fundos.sort_values(by=["Retorno(%)"], ascending=False)
 
 
@@ -422,7 +410,7 @@ def consulta_fundos_total(cnpj):
 # consulta fundos por cnpj com redimentos diarios
 
 
-def consulta_fundos_valores_diarios(cnpj):
+def consulta_fundos_valores_diarios(cnpj, data_inicio=None, data_fim=None):
     """
 
     Consulta fundos pelo CNPJ na base de dados da CVM
@@ -432,25 +420,38 @@ def consulta_fundos_valores_diarios(cnpj):
     cnpj: list
           lista com os cnpj solicitados em forma de lista
 
+    data_inicio : data
+                  YYYY-MM-DD, se informada le do armazenamento local somente
+                  os cnpj e colunas necessarios, sem usar o df informes
+
+    data_fim : data
+               YYYY-MM-DD
+
     Returns
     -------
     Pandas DataFrame com os cnpj escolhidos
 
     """
 
-    fundos = pd.DataFrame()
-
-    for cnpj in cnpj:
-        fundo = informes[informes["CNPJ_FUNDO"] == cnpj].set_index("DT_COMPTC")
-        fundo = fundo[["VL_QUOTA"]].rename(columns={"VL_QUOTA": cnpj})
-        fundos = pd.concat([fundos, fundo], axis=1)
+    if data_inicio is None:
+        indice = indice_informes
+    else:
+        # inclui o mes anterior para calculo de retornos
+        indice = IndiceFundos(carrega_informes(
+            pd.to_datetime(data_inicio) - pd.DateOffset(months=1), data_fim,
+            colunas=COLUNAS_VALORES_DIARIOS, cnpjs=cnpj))
+
+    # seleciona as linhas de todos os fundos de uma vez e monta a matriz
+    linhas = indice.informes.iloc[indice.linhas(cnpj)]
+    quotas = MatrizQuotas.constroi(linhas[["CNPJ_FUNDO", "DT_COMPTC", "VL_QUOTA"]])
+    fundos = quotas.quadro("quotas").reindex(columns=list(cnpj))
     fundos.index = pd.to_datetime(fundos.index)
-    return fundos
+    return fundos.rename_axis("DT_COMPTC")
 
 
 # funcao para calcular retorno diario de um dataframe de valores diarios
 
-def retorno_diario_df_valores(df, data_inicio, data_fim):
+def retorno_diario_df_valores(df, data_inicio, data_fim, retornos=None):
     """
 
     Mensaliza o retorno de um bando de dados baseado nas datas de inicio e fim
@@ -462,34 +463,24 @@ def retorno_diario_df_valores(df, data_inicio, data_fim):
         Banco de dados com datetime no index e uma coluna com os valores para cada
         cnpj
 
+    retornos : Retornos
+        motor ja construido para o mesmo df e periodo, se None e construido aqui
+
     Returns
     -------
     1. Pandas DataFrame com os retornos diarios
     2. Pandas DataFrame com os retornos diarios acumulados
 
     """
-    # tratamento das datas incluido o mes anterior para calculo de retornos
-    # data_inicial = pd.to_datetime(data_inicio,
-    #                               format="%Y/%m/%d") - pd.DateOffset(days=1)
-    data_inicial = pd.to_datetime(data_inicio) - pd.DateOffset(days=1)
-    data_inicial = data_inicial.strftime("%Y-%m-%d")
-    df = df.loc[data_inicial:data_fim]
-
-    # Calculate daily returns
-    ret_dia = df.pct_change()
-    ret_dia_acum = (1 + ret_dia).cumprod() - 1
-    ret_dia = round(ret_dia * 100, 2)
-    ret_dia_acum = round(ret_dia_acum * 100, 2)
 
-    # define data de retorno dos df
-    ret_dia = ret_dia[data_inicio:data_fim]
-    ret_dia_acum = ret_dia_acum[data_inicio:data_fim]
-    return ret_dia, ret_dia_acum
+    if retornos is None:
+        retornos = Retornos(df, data_inicio, data_fim)
+    return apresenta(retornos.periodicos('D')), apresenta(retornos.acumulados('D'))
 
 
 # funcao para calcular retorno diario de um dataframe de porcentagens diarios
 
-def retorno_diario_df_pct(df, data_inicio, data_fim):
+def retorno_diario_df_pct(df, data_inicio, data_fim, retornos=None):
     """
 
     Mensaliza o retorno de um bando de dados baseado nas datas de inicio e fim
@@ -507,34 +498,24 @@ def retorno_diario_df_pct(df, data_inicio, data_fim):
     data_fim : Date
         Data do final do arquivo que tera o retorno mensalizado (index - Datetime)
 
+    retornos : Retornos
+        motor ja construido para o mesmo df e periodo, se None e construido aqui
+
     Returns
     -------
     1. Pandas DataFrame com os retornos diarios
     2. Pandas DataFrame com os retornos diarios acumulados
 
     """
-    # tratamento das datas incluido o mes anterior para calculo de retornos
-    # data_inicial = pd.to_datetime(data_inicio,
-    #                               format="%Y/%m/%d") - pd.DateOffset(days=1)
-    data_inicial = pd.to_datetime(data_inicio) - pd.DateOffset(days=1)
-    data_inicial = data_inicial.strftime("%Y-%m-%d")
-    df = df.loc[data_inicial:data_fim]
-
-    # Calculate daily returns
-
-    ret_dia = df
-    ret_dia_acum = (1 + ret_dia / 100).cumprod() - 1
-    ret_dia_acum = round(ret_dia_acum * 100, 2)
 
-    # define data de retorno dos df
-    ret_dia = ret_dia.loc[data_inicio:data_fim]
-    ret_dia_acum = ret_dia_acum[data_inicio:data_fim]
-    return ret_dia, ret_dia_acum
+    if retornos is None:
+        retornos = Retornos(df, data_inicio, data_fim, pct=True)
+    return retornos.serie.loc[data_inicio:data_fim], apresenta(retornos.acumulados('D'))
 
 
 # funcao para calcular retorno mensal de um dataframe de valores diarios
 
-def retorno_mensal_df_valores(df, data_inicio, data_fim):
+def retorno_mensal_df_valores(df, data_inicio, data_fim, retornos=None):
     # TODO: tratar inicio do df na funcao de origem
     """
 
@@ -553,6 +534,9 @@ def retorno_mensal_df_valores(df, data_inicio, data_fim):
     data_fim : Date
         Data do final do arquivo que tera o retorno mensalizado (index - Datetime)
 
+    retornos : Retornos
+        motor ja construido para o mesmo df e periodo, se None e construido aqui
+
     Returns
     -------
     1. Pandas DataFrame com os cnpj escolhidos e retornos mensais
@@ -560,33 +544,15 @@ def retorno_mensal_df_valores(df, data_inicio, data_fim):
 
     """
 
-    # tratamento das datas incluido o mes anterior para calculo de retornos
-    # data_inicial = pd.to_datetime(data_inicio,
-    #                               format="%Y/%m/%d") - pd.DateOffset(days=1)
-    data_inicial = pd.to_datetime(data_inicio) - pd.DateOffset(days=1)
-    data_inicial = data_inicial.strftime("%Y-%m-%d")
-    df = df.loc[data_inicial:data_fim]
-
-    # Calculate monthly returns
-    ret_mensal = df.pct_change().resample('M').agg(lambda x: (x + 1).prod() - 1)
-    # ret_mensal = df.pct_change(freq='BM').dropna()
-
-    # Calculate monthly cumulative returns
-    ret_mensal_acum = (1 + ret_mensal).cumprod() - 1
-
-    ret_mensal = round(ret_mensal * 100, 2)[data_inicio:data_fim]
-    ret_mensal_acum = round(ret_mensal_acum * 100, 2)[data_inicio:data_fim]
-
-    # define data de retorno dos df
-    ret_mensal.index = ret_mensal.index.strftime('%Y-%m')
-    ret_mensal_acum.index = ret_mensal_acum.index.strftime('%Y-%m')
-
-    return ret_mensal, ret_mensal_acum
+    if retornos is None:
+        retornos = Retornos(df, data_inicio, data_fim)
+    return (apresenta(retornos.periodicos('M'), 'M'),
+            apresenta(retornos.acumulados('M'), 'M'))
 
 
 # funcao para calcular retorno mensal de um dataframe de valores diarios percentuas
 
-def retorno_mensal_df_pct(df, data_inicio, data_fim):
+def retorno_mensal_df_pct(df, data_inicio, data_fim, retornos=None):
     # TODO: tratar inicio do df na funcao de origem
     """
 
@@ -605,6 +571,9 @@ def retorno_mensal_df_pct(df, data_inicio, data_fim):
     data_fim : Date
         Data do final do arquivo que tera o retorno mensalizado (index - Datetime)
 
+    retornos : Retornos
+        motor ja construido para o mesmo df e periodo, se None e construido aqui
+
     Returns
     -------
 
@@ -613,34 +582,73 @@ def retorno_mensal_df_pct(df, data_inicio, data_fim):
 
     """
 
-    # tratamento das datas incluido o mes anterior para calculo de retornos
-    # data_inicial = pd.to_datetime(data_inicio,
-    #                               format="%Y/%m/%d") - pd.DateOffset(days=1)
-    data_inicial = pd.to_datetime(data_inicio) - pd.DateOffset(days=1)
-    data_inicial = data_inicial.strftime("%Y-%m-%d")
-    df = df.loc[data_inicial:data_fim]
+    if retornos is None:
+        retornos = Retornos(df, data_inicio, data_fim, pct=True)
+    return (apresenta(retornos.periodicos('M'), 'M'),
+            apresenta(retornos.acumulados('M'), 'M'))
 
-    # Calculate monthly returns
-    ret_mensal = df.resample('M').agg(
-        lambda x: (x / 100 + 1).prod() - 1)
-    # ret_mensal = df.pct_change(freq='BM').dropna()
 
-    # Calculate monthly cumulative returns
-    ret_mensal_acum = (1 + ret_mensal).cumprod() - 1
+# funcao retornos do universo de classificacao
 
-    ret_mensal = round(ret_mensal * 100, 2)[data_inicio:data_fim]
-    ret_mensal_acum = round(ret_mensal_acum * 100, 2)[data_inicio:data_fim]
+def retornos_classifica(minimo_cotista=100, classe='', data_inicio=None,
+                        data_fim=None, matriz=None, filtros=None, metricas=False,
+                        cdi=None):
+    """
 
-    # define data de retorno dos df
-    ret_mensal.index = ret_mensal.index.strftime('%Y-%m')
-    ret_mensal_acum.index = ret_mensal_acum.index.strftime('%Y-%m')
+    Retorno no periodo de cada fundo do universo classificado
 
-    return ret_mensal, ret_mensal_acum
+    Parameters
+    ----------
+    ver classifica_fundos
+
+    metricas : bool
+               calcula tambem as metricas de risco (fin_ranking.metricas_risco)
+
+    Returns
+    -------
+    Pandas DataFrame com CNPJ_FUNDO no index, ver fin_ranking.retornos_periodo
+    e fin_ranking.metricas_risco
+
+    """
+
+    # seleciona fundos por classe e atributos no indice do cadastro
+    filtros = dict(filtros or {})
+    if classe:
+        filtros['CLASSE'] = CLASSES.get(classe, classe)
+    fundos = indice_cadastro.chaves_filtro(**filtros) if filtros else None
+
+    # retorno entre a primeira e a ultima quota valida de cada fundo
+    if matriz is not None:
+        colunas = None if fundos is None else matriz.posicoes(fundos)
+        if metricas:
+            return metricas_risco(matriz, cdi, minimo_cotista, colunas,
+                                  data_inicio, data_fim)
+        return retornos_matriz(matriz, minimo_cotista, colunas,
+                               data_inicio, data_fim)
+
+    if data_inicio is None:
+        sel_fundos = informes
+        if fundos is not None:
+            sel_fundos = informes.iloc[indice_informes.linhas(fundos)]
+    else:
+        # filtros aplicados na leitura de cada mes do armazenamento local
+        consulta = ConsultaInformes().filtra(minimo_cotista=minimo_cotista) \
+            .periodo(data_inicio, data_fim).colunas(COLUNAS_CLASSIFICACAO)
+        if fundos is not None:
+            consulta = consulta.filtra(cnpjs=[chave_para_cnpj(chave) for chave in fundos])
+        sel_fundos = consulta.executa()
+
+    if metricas:
+        return metricas_risco(MatrizQuotas.constroi(sel_fundos[COLUNAS_CLASSIFICACAO]),
+                              cdi, minimo_cotista)
+    return retornos_periodo(sel_fundos, minimo_cotista)
 
 
 # funcao que seleciona e classifica fundos
 
-def classifica_fundos(classificacao='melhores', num_ranking=0, minimo_cotista=100, classe=''):
+def classifica_fundos(classificacao='melhores', num_ranking=0, minimo_cotista=100, classe='',
+                      data_inicio=None, data_fim=None, matriz=None, filtros=None,
+                      metrica='Retorno', cdi=None):
     """
     Parameters
     ----------
@@ -655,7 +663,31 @@ def classifica_fundos(classificacao='melhores', num_ranking=0, minimo_cotista=10
 
     classe          : string
                     seleciona o tipo de fundo ('acoes', 'multimercado',
-                                               'rendafixa', 'cambial )
+                                               'rendafixa', 'cambial ) ou
+                    a CLASSE do cadastro
+
+    data_inicio     : data
+                    YYYY-MM-DD, se informada le do armazenamento local somente
+                    as colunas, fundos e datas necessarios, sem usar o df informes
+
+    data_fim        : data
+                    YYYY-MM-DD
+
+    matriz          : MatrizQuotas
+                    matriz datas x fundos construida dos informes, evita o
+                    pivot dos informes a cada chamada
+
+    filtros         : dict
+                    outros atributos do indice do cadastro, ex.:
+                    {'SIT': 'EM FUNCIONAMENTO NORMAL', 'PL': 'acima de 10 bi'}
+
+    metrica         : string
+                    metrica da classificacao ('Retorno', 'Retorno anual',
+                    'Volatilidade', 'Sharpe', 'Sortino', 'Drawdown maximo',
+                    'Calmar')
+
+    cdi             : DataFrame
+                    CDI diario (consulta_bcb(12)) usado no Sharpe e no Sortino
 
 
     Returns
@@ -663,61 +695,39 @@ def classifica_fundos(classificacao='melhores', num_ranking=0, minimo_cotista=10
     Pandas DataFrame com os melhore ou piores fundos
     """
 
-    # selecao de fundos conforme cotistas
-    sel_fundos = informes[informes['NR_COTST'] >= minimo_cotista]
-
-    # seleciona fundos por tipo
-    if classe == 'multimercado':
-        fundo_classe = cadastro[cadastro['CLASSE']
-                                == 'Fundo Multimercado']
-        sel_fundos = sel_fundos[sel_fundos['CNPJ_FUNDO'].isin(
-            fundo_classe.index)]
-    if classe == 'acoes':
-        fundo_classe = cadastro[cadastro['CLASSE'] == 'Fundo de Ações']
-        sel_fundos = sel_fundos[sel_fundos['CNPJ_FUNDO'].isin(
-            fundo_classe.index)]
-    if classe == 'rendafixa':
-        fundo_classe = cadastro[cadastro['CLASSE']
-                                == 'Fundo de Renda Fixa']
-        sel_fundos = sel_fundos[sel_fundos['CNPJ_FUNDO'].isin(
-            fundo_classe.index)]
-    if classe == 'cambial':
-        fundo_classe = cadastro[cadastro['CLASSE'] == 'Fundo Cambial']
-        sel_fundos = sel_fundos[sel_fundos['CNPJ_FUNDO'].isin(
-            fundo_classe.index)]
-
-    # prepara dataset
-    sel_fundos = sel_fundos.pivot(index='DT_COMPTC',
-                                  columns='CNPJ_FUNDO')
-
-    # normaliza as quotas
-    fundos_retorno = sel_fundos['VL_QUOTA'] / sel_fundos['VL_QUOTA'].iloc[0]
-
-    # seleciona o tipo de classificacao
-    classifica = False if classificacao == 'melhores' else True
-
-    # seleciona a quantidade de fundos analisados
-    num_fundos = len(fundos_retorno.columns) \
-        if num_ranking == 0 else num_ranking
-
+    # retornos do universo memorizados por (versao, periodo, classe, cotistas),
+    # melhores e piores do mesmo universo sao calculados uma vez; o CDI entra
+    # na chave pelo conteudo e somente quando as metricas de risco sao usadas,
+    # o cadastro pela versao do indice quando ha classe ou filtros
+    metricas = metrica != 'Retorno'
+    classe = CLASSES.get(classe, classe)
+    versao = None if matriz is None else matriz.versao
+    if versao is None:
+        retornos = retornos_classifica(minimo_cotista, classe, data_inicio,
+                                       data_fim, matriz, filtros, metricas, cdi)
+    else:
+        retornos = memoriza(
+            (versao, data_inicio, data_fim, classe, minimo_cotista,
+             repr(sorted((filtros or {}).items())),
+             indice_cadastro.versao if classe or filtros else None, metricas,
+             versao_serie(cdi) if metricas else None),
+            lambda: retornos_classifica(minimo_cotista, classe, data_inicio,
+                                        data_fim, matriz, filtros, metricas, cdi))
+
+    # seleciona o tipo de classificacao conforme a metrica
+    classifica = METRICAS[metrica] if classificacao == 'melhores' \
+        else not METRICAS[metrica]
+
+    # seleciona os extremos sem ordenar todos os fundos
+    selecionados = extremos(retornos[metrica], num_ranking, classifica)
     selecao_fundos = pd.DataFrame()
-    rank = np.arange(1, num_fundos + 1)
-
-    selecao_fundos['Retorno(%)'] = (
-        fundos_retorno.iloc[-1].sort_values(ascending=classifica))
-    selecao_fundos = round((selecao_fundos - 1) * 100, 2)[:num_fundos]
-    selecao_fundos.insert(0, 'Rank', rank)
-
-    selecao_fundos['Nome'] = [cadastro.loc[cnpj, 'DENOM_SOCIAL']
-                              for cnpj in selecao_fundos.index]
-    selecao_fundos['Tipo'] = [cadastro.loc[cnpj, 'TP_FUNDO']
-                              for cnpj in selecao_fundos.index]
-    selecao_fundos['Classe'] = [cadastro.loc[cnpj, 'CLASSE']
-                                for cnpj in selecao_fundos.index]
-    selecao_fundos['PL'] = [cadastro.loc[cnpj, 'VL_PATRIM_LIQ']
-                            for cnpj in selecao_fundos.index]
+    selecao_fundos['Retorno(%)'] = round(
+        retornos.loc[selecionados.index, 'Retorno'] * 100, 2)
+    if metricas:
+        selecao_fundos[metrica] = round(selecionados, 4)
+    selecao_fundos.insert(0, 'Rank', np.arange(1, len(selecao_fundos) + 1))
 
-    return selecao_fundos
+    return junta_cadastro(selecao_fundos, cadastro)
 
 
 # Funcao do graficos diarios do retorno
@@ -834,10 +844,20 @@ cadastro = consulta_cvm_cadastro()
 # cadastro.to_csv('cadastro.csv')
 # cadastro = pd.read_csv('cadastro.csv').set_index('CNPJ_FUNDO')
 
+# bitmaps dos atributos do cadastro para os filtros da classificacao
+indice_cadastro = IndiceAtributos(cadastro)
+
+# busca por nome do fundo, administrador e gestor
+indice_nomes = IndiceNomes(cadastro)
+
 # %% Opcao 1
 # # consulta informes de fundos por periodo na cvm com valores de cotas
 
 informes = consulta_cvm_informes(data_inicio, data_fim)
+
+# informes ordenados por cnpj e data com indice por fundo
+indice_informes = IndiceFundos(informes)
+informes = indice_informes.informes
 # informes.to_csv('informes.csv')
 # informes = pd.read_csv('informes.csv').drop('Unnamed: 0', axis=1)
 
@@ -856,6 +876,9 @@ informes = consulta_cvm_informes(data_inicio, data_fim)
 # informes.to_csv('informes_mai22.csv')
 # informes = pd.read_csv('informes_mai22.csv').drop('Unnamed: 0', axis=1)
 
+# ultimo dataset gravado por consulta_cvm_informes_upgrade ou _zip
+# informes = DatasetInformes.carrega().informes
+
 
 # %% consulta dados da bolsa
 # TODO - bug no yfinance verificar no final
@@ -869,13 +892,16 @@ acoes_diario = consulta_yahoo(ativos, '2023-03-01', '2023-03-31')
 
 # %% Calculate daily returns
 
+# diario, mensal e acumulados do mesmo motor (uma passada na serie)
+acoes_retornos = Retornos(acoes_diario, data_inicio, data_fim)
+
 acoes_ret_diario, acoes_ret_diario_acum = retorno_diario_df_valores(
-    acoes_diario, data_inicio, data_fim)
+    acoes_diario, data_inicio, data_fim, acoes_retornos)
 
 # %% Calculate monthly returns
 
 acoes_ret_mensal, acoes_ret_mensal_acum = retorno_mensal_df_valores(
-    acoes_diario, data_inicio, data_fim)
+    acoes_diario, data_inicio, data_fim, acoes_retornos)
 
 
 # %% consulta dados do dolar comercial
@@ -887,13 +913,15 @@ dolar_diario.columns = ['Dolar']
 
 # %% Calculate daily returns
 
+dolar_retornos = Retornos(dolar_diario, data_inicio, data_fim)
+
 dolar_ret_diario, dolar_ret_diario_acum = retorno_diario_df_valores(
-    dolar_diario, data_inicio, data_fim)
+    dolar_diario, data_inicio, data_fim, dolar_retornos)
 
 # %% Calculate monthly returns
 
 dolar_ret_mensal, dolar_ret_mensal_acum = retorno_mensal_df_valores(
-    dolar_diario, data_inicio, data_fim)
+    dolar_diario, data_inicio, data_fim, dolar_retornos)
 
 
 # %% consulta cdi e calcula acumulado
@@ -906,15 +934,17 @@ cdi_diario.columns = ['CDI']
 # %% Calculate daily returns
 
 
+cdi_retornos = Retornos(cdi_diario, data_inicio, data_fim, pct=True)
+
 cdi_ret_diario, cdi_ret_diario_acum = retorno_diario_df_pct(
-    cdi_diario, data_inicio, data_fim)
+    cdi_diario, data_inicio, data_fim, cdi_retornos)
 
 
 # %% Calculate monthly returns
 
 
 cdi_ret_mensal, cdi_ret_mensal_acum = retorno_mensal_df_pct(
-    cdi_diario, data_inicio, data_fim)
+    cdi_diario, data_inicio, data_fim, cdi_retornos)
 
 
 # %% consulta ipca mensal e calcula acumulado
@@ -985,30 +1015,34 @@ itau_diario.columns = ITAU_NAMES
 # %% Calculate daily returns
 
 
+itau_retornos = Retornos(itau_diario, data_inicio, data_fim)
+
 itau_ret_diario, itau_ret_diario_acum = retorno_diario_df_valores(
-    itau_diario, data_inicio, data_fim)
+    itau_diario, data_inicio, data_fim, itau_retornos)
 
 
 # %% Calculate monthly returns
 
 
 itau_ret_mensal, itau_ret_mensal_acum = retorno_mensal_df_valores(
-    itau_diario, data_inicio, data_fim)
+    itau_diario, data_inicio, data_fim, itau_retornos)
 
 
 # BB
 # %% Calculate daily returns
 
 
+bb_retornos = Retornos(bb_diario, data_inicio, data_fim)
+
 bb_ret_diario, bb_ret_diario_acum = retorno_diario_df_valores(
-    bb_diario, data_inicio, data_fim)
+    bb_diario, data_inicio, data_fim, bb_retornos)
 
 
 # %% Calculate monthly returns
 
 
 bb_ret_mensal, bb_ret_mensal_acum = retorno_mensal_df_valores(
-    bb_diario, data_inicio, data_fim)
+    bb_diario, data_inicio, data_fim, bb_retornos)
 
 
 # %% valores diarios
@@ -1132,15 +1166,22 @@ plot_retorno_mensal(bb_retorno_mensal_acum, "BB Mensal Acumulado")
 
 # Se ocorrer erro - consultar cadastro completop na CVM
 # cadastro = consulta_cvm_cadastro_completo()
-
-melhores_fundos = classifica_fundos('melhores', 1000)
-piores_fundos = classifica_fundos('piores',1000)
-# melhores_acoes = classifica_fundos('melhores', 100, classe='acoes')
-# piores_acoes = classifica_fundos('piores', 100, classe='acoes')
-melhores_rfixa = classifica_fundos('melhores', 100, classe='rendafixa')
-piores_rfixa = classifica_fundos('piores', 100, classe='rendafixa')
-melhores_multi = classifica_fundos('melhores', 100, classe='multimercado')
-piores_multi = classifica_fundos('piores', 100, classe='multimercado')
+# indice_cadastro = IndiceAtributos(cadastro)
+# indice_nomes = IndiceNomes(cadastro)
+
+# matriz datas x fundos construida uma vez e compartilhada pelas classificacoes
+matriz_quotas = MatrizQuotas.constroi(informes)
+matriz_quotas.grava()
+# matriz_quotas = MatrizQuotas.carrega()
+
+melhores_fundos = classifica_fundos('melhores', 1000, matriz=matriz_quotas)
+piores_fundos = classifica_fundos('piores', 1000, matriz=matriz_quotas)
+# melhores_acoes = classifica_fundos('melhores', 100, classe='acoes', matriz=matriz_quotas)
+# piores_acoes = classifica_fundos('piores', 100, classe='acoes', matriz=matriz_quotas)
+melhores_rfixa = classifica_fundos('melhores', 100, classe='rendafixa', matriz=matriz_quotas)
+piores_rfixa = classifica_fundos('piores', 100, classe='rendafixa', matriz=matriz_quotas)
+melhores_multi = classifica_fundos('melhores', 100, classe='multimercado', matriz=matriz_quotas)
+piores_multi = classifica_fundos('piores', 100, classe='multimercado', matriz=matriz_quotas)
 
 # melhores_fundos.to_csv('melhores_fundos.csv')
 # piores_fundos.to_csv('piores_fundos.csv')
@@ -1151,17 +1192,57 @@ piores_multi = classifica_fundos('piores', 100, classe='multimercado')
 # melhores_multi.to_csv('melhores_multi.csv')
 # piores_multi.to_csv('piores_multi.csv')
 
+# classificacao por metricas de risco contra o CDI
+melhores_sharpe = classifica_fundos('melhores', 100, matriz=matriz_quotas,
+                                    metrica='Sharpe', cdi=cdi_diario)
+menor_drawdown = classifica_fundos('melhores', 100, matriz=matriz_quotas,
+                                   metrica='Drawdown maximo', cdi=cdi_diario)
+
+# relatorio de todas as classes e tipos em uma passagem
+relatorio_classificacao = classifica_todos(
+    retornos_classifica(matriz=matriz_quotas), cadastro, 100)
+# relatorio_classificacao.to_excel('relatorio_classificacao.xlsx')
+
+# retorno e volatilidade em janelas moveis de 21, 63 e 252 dias
+janelas_moveis = JanelasMoveis.calcula(matriz_quotas)
+plot_retorno_diario(janelas_moveis.quadro('volatilidade_63', melhores_fundos.index[:10]),
+                    'Volatilidade 63 dias dos melhores')
+
+# retorno de todos os fundos em varios periodos, duas consultas por periodo
+log_quotas = LogQuotas.constroi(matriz_quotas)
+retornos_periodos = log_quotas.retornos(
+    {'Mes': (pd.to_datetime(data_fim) - pd.DateOffset(months=1), data_fim),
+     'Trimestre': (pd.to_datetime(data_fim) - pd.DateOffset(months=3), data_fim),
+     'Periodo': (data_inicio, data_fim)})
+
+
+# %% atualizacao diaria incremental da classificacao
+
+# estado por fundo montado uma vez com os informes do periodo
+estado_classificacao = EstadoClassificacao(100, cdi_diario)
+estado_classificacao.atualiza(informes)
+
+# nos dias seguintes somente o mes aberto republicado pela CVM e processado
+# hoje = pd.Timestamp.today()
+# estado_classificacao.atualiza(
+#     carrega_informes(hoje, hoje, colunas=COLUNAS_CLASSIFICACAO))
+melhores_hoje = junta_cadastro(
+    estado_classificacao.classifica('melhores', 100), cadastro)
+
 
 # %% analise e classifição dos indicadores financeiros dos fundos BB e ITAU
 
 
 # melhores_fundos = melhores_fundos.fillna().drop(index=12)
-melhores_ITAU = melhores_fundos[melhores_fundos['Nome'].str.startswith(
-    'ITAÚ')]
-melhores_BB = melhores_fundos[melhores_fundos['Nome'].str.startswith('BB')]
+# fundos da casa pelo indice de nomes (sem diferenca de acentos e maiusculas)
+nomes_itau = indice_nomes.prefixo('itau')
+nomes_bb = indice_nomes.prefixo('bb')
+
+melhores_ITAU = melhores_fundos[melhores_fundos.index.isin(nomes_itau)]
+melhores_BB = melhores_fundos[melhores_fundos.index.isin(nomes_bb)]
 
-piores_ITAU = piores_fundos[piores_fundos['Nome'].str.startswith('ITAÚ')]
-piores_BB = piores_fundos[piores_fundos['Nome'].str.startswith('BB')]
+piores_ITAU = piores_fundos[piores_fundos.index.isin(nomes_itau)]
+piores_BB = piores_fundos[piores_fundos.index.isin(nomes_bb)]
 
 melhores_ITAU.to_csv('melhores_itau.csv')
 melhores_BB.to_csv('melhores_bb.csv')
@@ -1171,8 +1252,10 @@ piores_BB.to_csv('piores_bb.csv')
 
 # %% fundos bb e itau
 
-fundos_itau = cadastro[cadastro['DENOM_SOCIAL'].str.startswith('ITAÚ')]
-fundos_bb = cadastro[cadastro['DENOM_SOCIAL'].str.startswith('BB')]
+fundos_itau = cadastro.loc[indice_nomes.prefixo('itau')]
+fundos_bb = cadastro.loc[indice_nomes.prefixo('bb')]
+# fundos_busca = cadastro.loc[indice_nomes.busca('itau acoes dividendos')]
+# fundos_busca = cadastro.loc[indice_nomes.aproximada('itao dividendo').index]
 
 ###############################################################################
 # %% seleciona analise de somente um fundo
@@ -1187,7 +1270,8 @@ fundo_diario = consulta_fundos_valores_diarios(fundo)
 fundo_ret_mensal,fundo_ret_acum = retorno_mensal_df_valores(
     fundo_diario, data_inicio, data_fim)
 
-dados_fundo = consulta_fundos_total(fundo)
+dados_fundo = consulta_fundos_total(fundo, informes, cadastro,
+                                    data_inicio, data_fim)
 
 
 # %% seleciona analise de mais de um fundo
@@ -1199,13 +1283,15 @@ fundos_diario = consulta_fundos_valores_diarios(fundos)
 fundos_ret_mensal,fundos_ret_acum = retorno_mensal_df_valores(
     fundos_diario, data_inicio, data_fim)
 
-dados_fundos = consulta_fundos_total(fundos)
+dados_fundos = consulta_fundos_total(fundos, informes, cadastro,
+                                     data_inicio, data_fim)
 
 
 # %% consulta fundos totais
 
 total = ITAU + BB
-fundos_total = consulta_fundos_total(total)
+fundos_total = consulta_fundos_total(total, informes, cadastro,
+                                     data_inicio, data_fim)
 fundos_total.to_excel('fundos_total.xlsx')
 
 # ===============================================================================
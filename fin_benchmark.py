@@ -0,0 +1,384 @@
+"""
+
+Benchmarks das funcoes de analise de fundos
+
+Os dados sao sinteticos, gerados no mesmo formato dos informes diarios da CVM
+e gravados em um armazenamento local temporario, portanto nao ha consulta a
+internet.
+
+"""
+
+# %% import libraries
+
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fin_cvm import (caminho_mes, carrega_informes, grava_mes, monta_informes,
+                     relatorio_memoria, tipa_informes)
+from fin_indices import MatrizQuotas
+from fin_ranking import METRICAS, EstadoClassificacao, metricas_risco
+from fin_retornos import Retornos
+
+# funcao gera informe mensal sintetico
+
+
+def gera_informe_mensal(ano, mes, num_fundos=2000, semente=0):
+    """
+
+    Gera um informe diario sintetico no formato da CVM
+
+    Parameters
+    ----------
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    num_fundos : int
+                 quantidade de fundos
+
+    semente : int
+              semente do gerador aleatorio
+
+    Returns
+    -------
+    Pandas DataFrame com as colunas do informe diario da CVM
+
+    """
+
+    rng = np.random.default_rng(semente + ano * 12 + mes)
+    inicio = pd.Timestamp(year=ano, month=mes, day=1)
+    dias = pd.bdate_range(inicio, inicio + pd.offsets.MonthEnd(0))
+    cnpjs = ["{}.{}.{}/{}-{}".format(c[:2], c[2:5], c[5:8], c[8:12], c[12:])
+             for c in ("{:014d}".format(i * 7919) for i in range(1, num_fundos + 1))]
+
+    n = len(dias) * num_fundos
+    return pd.DataFrame({
+        "TP_FUNDO": "FI",
+        "CNPJ_FUNDO": np.tile(cnpjs, len(dias)),
+        "DT_COMPTC": np.repeat(dias.strftime("%Y-%m-%d"), num_fundos),
+        "VL_TOTAL": rng.uniform(1e5, 1e9, n).round(2),
+        "VL_QUOTA": rng.uniform(1, 10, n).round(9),
+        "VL_PATRIM_LIQ": rng.uniform(1e5, 1e9, n).round(2),
+        "CAPTC_DIA": rng.uniform(0, 1e6, n).round(2),
+        "RESG_DIA": rng.uniform(0, 1e6, n).round(2),
+        "NR_COTST": rng.integers(1, 100000, n),
+    })
+
+
+def grava_informes_sinteticos(num_meses, diretorio, num_fundos=2000):
+    """
+
+    Grava meses sinteticos no armazenamento local a partir de jan/2000
+
+    Parameters
+    ----------
+    num_meses : int
+                quantidade de meses
+
+    diretorio : string
+                raiz do armazenamento local
+
+    num_fundos : int
+                 quantidade de fundos por mes
+
+    Returns
+    -------
+    tupla com as datas de inicio e fim dos meses gravados
+
+    """
+
+    datas = pd.date_range("2000-01-01", periods=num_meses, freq="MS")
+    for data in datas:
+        grava_mes(gera_informe_mensal(data.year, data.month, num_fundos),
+                  data.year, data.month, diretorio)
+    return datas[0], datas[-1]
+
+
+def mede(funcao, *args, **kwargs):
+    """
+
+    Mede tempo e pico de memoria de uma funcao
+
+    Returns
+    -------
+    1. resultado da funcao
+    2. tempo em segundos
+    3. pico de memoria em MB
+
+    """
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    tempo = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return resultado, tempo, pico
+
+
+# funcao carga antiga com pd.concat acumulado
+
+def carrega_informes_concat(data_inicio, data_fim, diretorio):
+    """
+
+    Carga dos informes como era feita antes: pd.concat a cada mes
+
+    """
+
+    informe_completo = pd.DataFrame()
+    for data in pd.date_range(data_inicio, data_fim, freq="MS"):
+        informe_mensal = pd.read_parquet(caminho_mes(data.year, data.month, diretorio))
+        informe_completo = pd.concat(
+            [informe_completo, informe_mensal], ignore_index=True)
+    return informe_completo
+
+
+def benchmark_carga_informes(meses=(12, 24, 60), num_fundos=2000):
+    """
+
+    Compara a carga com pd.concat acumulado e a montagem unica em colunas
+    alocadas previamente
+
+    Parameters
+    ----------
+    meses : tuple
+            quantidades de meses testadas
+
+    num_fundos : int
+                 quantidade de fundos por mes
+
+    Returns
+    -------
+    Pandas DataFrame com tempo (s) e pico de memoria (MB) de cada metodo
+
+    """
+
+    resultados = []
+    for num_meses in meses:
+        with tempfile.TemporaryDirectory() as diretorio:
+            inicio, fim = grava_informes_sinteticos(num_meses, diretorio, num_fundos)
+
+            antigo, tempo_antigo, pico_antigo = mede(
+                carrega_informes_concat, inicio, fim, diretorio)
+            novo, tempo_novo, pico_novo = mede(
+                carrega_informes, inicio, fim, diretorio, atualiza_abertos=False)
+            assert tipa_informes(antigo).equals(novo)
+
+        resultados.append({"Meses": num_meses,
+                           "Linhas": len(novo),
+                           "Tempo concat(s)": round(tempo_antigo, 2),
+                           "Tempo montagem(s)": round(tempo_novo, 2),
+                           "Pico concat(MB)": round(pico_antigo, 1),
+                           "Pico montagem(MB)": round(pico_novo, 1)})
+
+    return pd.DataFrame(resultados).set_index("Meses")
+
+
+def benchmark_memoria_informes(num_meses=12, num_fundos=2000):
+    """
+
+    Memoria dos informes no leiaute original (texto) e no leiaute tipado
+
+    Parameters
+    ----------
+    num_meses : int
+                quantidade de meses
+
+    num_fundos : int
+                 quantidade de fundos por mes
+
+    Returns
+    -------
+    Pandas DataFrame com a memoria por coluna, ver relatorio_memoria
+
+    """
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        inicio, fim = grava_informes_sinteticos(num_meses, diretorio, num_fundos)
+        antes = carrega_informes_concat(inicio, fim, diretorio)
+        depois = carrega_informes(inicio, fim, diretorio, atualiza_abertos=False)
+
+    return relatorio_memoria(antes, depois)
+
+
+# funcao retorno mensal com lambda por coluna e por mes
+
+def gera_quotas_diarias(num_fundos=5000, anos=3, semente=0):
+    """
+
+    Quotas diarias sinteticas (passeio aleatorio) de varios fundos
+
+    Parameters
+    ----------
+    num_fundos : int
+                 quantidade de fundos (colunas)
+
+    anos : int
+           quantidade de anos de dias uteis a partir de jan/2000
+
+    semente : int
+              semente do gerador aleatorio
+
+    Returns
+    -------
+    Pandas DataFrame com datetime no index e uma coluna por fundo
+
+    """
+
+    rng = np.random.default_rng(semente)
+    dias = pd.bdate_range("2000-01-01", periods=252 * anos)
+    quotas = np.exp(np.cumsum(rng.normal(0.0003, 0.01, (len(dias), num_fundos)), axis=0))
+    quotas = pd.DataFrame(quotas, index=dias)
+
+    # fundos que iniciam no meio do periodo
+    quotas.iloc[:126, :num_fundos // 10] = np.nan
+    return quotas
+
+
+def retorno_mensal_lambda(quotas):
+    """
+
+    Retorno mensal como era calculado antes: resample com lambda
+
+    """
+
+    return quotas.pct_change().resample("M").agg(lambda x: (x + 1).prod() - 1)
+
+
+def retorno_mensal_vetorizado(quotas):
+    """
+
+    Retorno mensal pelo mesmo caminho de retorno_mensal_df_valores: motor
+    Retornos com a composicao vetorizada do log dos retornos
+
+    """
+
+    data_fim = quotas.index[-1] + pd.offsets.MonthEnd(0)
+    return Retornos(quotas, quotas.index[0], data_fim).periodicos("M")
+
+
+def benchmark_retorno_mensal(num_fundos=5000, anos=3):
+    """
+
+    Compara o retorno mensal com lambda por coluna e a composicao vetorizada
+    do motor Retornos
+
+    Parameters
+    ----------
+    num_fundos : int
+                 quantidade de fundos
+
+    anos : int
+           quantidade de anos
+
+    Returns
+    -------
+    Pandas DataFrame com o tempo (s) de cada metodo
+
+    """
+
+    quotas = gera_quotas_diarias(num_fundos, anos)
+
+    antigo, tempo_antigo, _ = mede(retorno_mensal_lambda, quotas)
+    novo, tempo_novo, _ = mede(retorno_mensal_vetorizado, quotas)
+    assert (round(antigo * 100, 2) == round(novo * 100, 2)).all().all()
+
+    return pd.DataFrame({"Fundos": [num_fundos], "Anos": [anos],
+                         "Tempo lambda(s)": [round(tempo_antigo, 2)],
+                         "Tempo vetorizado(s)": [round(tempo_novo, 3)]}).set_index("Fundos")
+
+
+# funcao conferencia das metricas com falhas nos informes
+
+def confere_metricas_incrementais(num_fundos=300, meses=3, falhas=0.15, semente=0):
+    """
+
+    Confere as metricas de risco da matriz (metricas_risco) com as do estado
+    incremental (EstadoClassificacao) em informes com falhas: dias sem
+    informe de cada fundo e um fundo com informes em sabados, que nao podem
+    alterar as metricas dos demais fundos
+
+    Parameters
+    ----------
+    num_fundos : int
+                 quantidade de fundos
+
+    meses : int
+            quantidade de meses a partir de jan/2023
+
+    falhas : float
+             fracao das linhas removidas
+
+    semente : int
+              semente do gerador aleatorio
+
+    Returns
+    -------
+    Pandas DataFrame com a maior diferenca de cada metrica por minimo de cotistas
+
+    """
+
+    rng = np.random.default_rng(semente)
+    informes = monta_informes([tipa_informes(gera_informe_mensal(2023, mes, num_fundos, semente))
+                               for mes in range(1, meses + 1)])
+
+    # quotas em passeio aleatorio por fundo e dias sem informe
+    informes = informes.sort_values(["CNPJ_FUNDO", "DT_COMPTC"], kind="stable")
+    retornos = pd.Series(rng.normal(0.0003, 0.01, len(informes)))
+    informes["VL_QUOTA"] = np.exp(
+        retornos.groupby(informes["CNPJ_FUNDO"].to_numpy()).cumsum().to_numpy())
+    informes = informes[rng.random(len(informes)) > falhas]
+
+    # um fundo com informes em sabados (datas que os demais nao tem)
+    sabados = informes[informes["CNPJ_FUNDO"] == informes["CNPJ_FUNDO"].iloc[0]].iloc[:3].copy()
+    sabados["DT_COMPTC"] = pd.date_range("2023-01-07", periods=3, freq="7D")
+    informes = pd.concat([informes, sabados], ignore_index=True)
+
+    dias = pd.date_range("2022-12-01", periods=31 * (meses + 1))
+    cdi = pd.DataFrame({"CDI": rng.uniform(0.04, 0.05, len(dias))}, index=dias)
+    matriz = MatrizQuotas.constroi(informes)
+
+    diferencas = {}
+    for minimo_cotista in (0, 50000):
+        matricial = metricas_risco(matriz, cdi, minimo_cotista)
+
+        # estado atualizado mes a mes, como na atualizacao diaria
+        estado = EstadoClassificacao(minimo_cotista, cdi)
+        for _, mensal in informes.groupby(informes["DT_COMPTC"].dt.month):
+            estado.atualiza(mensal)
+        incremental = estado.metricas()[list(METRICAS)].reindex(matricial.index)
+
+        assert np.allclose(matricial, incremental, rtol=1e-9, atol=1e-12, equal_nan=True)
+        diferencas[minimo_cotista] = (matricial - incremental).abs().max()
+
+    return pd.DataFrame(diferencas).T.rename_axis("Minimo cotista")
+
+
+# %% carga dos informes
+
+carga_informes = benchmark_carga_informes()
+print(carga_informes)
+
+
+# %% memoria dos informes tipados
+
+memoria_informes = benchmark_memoria_informes()
+print(memoria_informes)
+
+
+# %% retorno mensal de 5000 fundos em 3 anos
+
+retorno_mensal = benchmark_retorno_mensal()
+print(retorno_mensal)
+
+
+# %% metricas da matriz e do estado incremental com falhas nos informes
+
+metricas_incrementais = confere_metricas_incrementais()
+print(metricas_incrementais)
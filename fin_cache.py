@@ -0,0 +1,309 @@
+"""
+
+Cache local das consultas HTTP da CVM e do Banco Central
+
+Os arquivos baixados sao gravados em disco junto com o ETag e o Last-Modified
+informados pelo servidor. Nas consultas seguintes o arquivo so e baixado
+novamente se o servidor indicar que mudou (resposta 304 caso contrario).
+
+O cache tem tamanho maximo, removendo os arquivos usados ha mais tempo, e um
+modo offline que usa somente os arquivos ja gravados:
+
+    export FIN_OFFLINE=1
+
+Arquivos grandes (ex.: arquivos anuais do HIST da CVM) sao gravados por
+arquivo() em um caminho fixo, fora do limite de tamanho do cache.
+
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+
+DIR_CACHE = os.path.join("dados", "cache_http")
+
+# tamanho maximo do cache em bytes
+TAMANHO_MAXIMO = 2 * 2**30
+
+TIMEOUT = 60
+
+# bytes copiados por vez na gravacao dos arquivos grandes
+TAMANHO_BLOCO = 2**20
+
+# modo offline, usa somente os arquivos ja gravados no cache
+OFFLINE = os.environ.get("FIN_OFFLINE", "") not in ("", "0")
+
+_trava = threading.Lock()
+
+
+class ErroOffline(Exception):
+    """ url ausente do cache no modo offline """
+
+
+# funcoes do indice do cache
+
+def _caminho_indice(diretorio):
+    return os.path.join(diretorio, "indice.json")
+
+
+def _caminho_arquivo(url, diretorio):
+    return os.path.join(diretorio, hashlib.sha1(url.encode()).hexdigest())
+
+
+def _le_indice(diretorio):
+    try:
+        with open(_caminho_indice(diretorio), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _grava_indice(indice, diretorio):
+    os.makedirs(diretorio, exist_ok=True)
+    temporario = _caminho_indice(diretorio) + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(indice, arquivo)
+    os.replace(temporario, _caminho_indice(diretorio))
+
+
+def _remove_antigos(indice, diretorio, tamanho_maximo):
+    """ remove os arquivos usados ha mais tempo ate caber no tamanho maximo """
+
+    total = sum(entrada["tamanho"] for entrada in indice.values())
+    for url in sorted(indice, key=lambda url: indice[url]["acesso"]):
+        if total <= tamanho_maximo:
+            break
+        total -= indice[url]["tamanho"]
+        try:
+            os.remove(_caminho_arquivo(url, diretorio))
+        except FileNotFoundError:
+            pass
+        del indice[url]
+
+
+def _requisicao(url, entrada):
+    """ requisicao condicional pelo ETag/Last-Modified da entrada """
+
+    requisicao = urllib.request.Request(url)
+    if entrada is not None:
+        if entrada.get("etag"):
+            requisicao.add_header("If-None-Match", entrada["etag"])
+        if entrada.get("last_modified"):
+            requisicao.add_header("If-Modified-Since", entrada["last_modified"])
+    return requisicao
+
+
+# funcoes de consulta
+
+def baixa(url, diretorio=DIR_CACHE, offline=None, tamanho_maximo=TAMANHO_MAXIMO,
+          timeout=TIMEOUT):
+    """
+
+    Conteudo de uma url, revalidado pelo ETag/Last-Modified do cache local
+
+    Parameters
+    ----------
+    url : string
+          endereco consultado
+
+    diretorio : string
+                pasta do cache
+
+    offline : bool
+              usa somente o cache, sem acessar a internet. Se None usa a
+              variavel de ambiente FIN_OFFLINE
+
+    tamanho_maximo : int
+                     tamanho maximo do cache em bytes
+
+    timeout : int
+              tempo maximo da consulta em segundos
+
+    Returns
+    -------
+    bytes com o conteudo da url
+
+    """
+
+    offline = OFFLINE if offline is None else offline
+    caminho = _caminho_arquivo(url, diretorio)
+
+    with _trava:
+        entrada = _le_indice(diretorio).get(url)
+    if entrada is not None and not os.path.exists(caminho):
+        entrada = None
+
+    if offline:
+        if entrada is None:
+            raise ErroOffline("Modo offline: {} não está no cache".format(url))
+        return _conteudo_cache(url, caminho, diretorio)
+
+    # consulta condicional, o servidor responde 304 se o arquivo nao mudou
+    requisicao = _requisicao(url, entrada)
+
+    try:
+        with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+            conteudo = resposta.read()
+            cabecalhos = resposta.headers
+
+    except urllib.error.HTTPError as erro:
+        if erro.code == 304 and entrada is not None:
+            return _conteudo_cache(url, caminho, diretorio)
+        raise
+
+    os.makedirs(diretorio, exist_ok=True)
+    temporario = "{}.{}.tmp".format(caminho, threading.get_ident())
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+    with _trava:
+        indice = _le_indice(diretorio)
+        indice[url] = {"etag": cabecalhos.get("ETag"),
+                       "last_modified": cabecalhos.get("Last-Modified"),
+                       "tamanho": len(conteudo),
+                       "acesso": time.time()}
+        _remove_antigos(indice, diretorio, tamanho_maximo)
+        _grava_indice(indice, diretorio)
+
+    return conteudo
+
+
+def abre(url, **kwargs):
+    """
+
+    Conteudo de uma url em um buffer, pronto para o pd.read_csv
+
+    Parameters
+    ----------
+    url : string
+          endereco consultado
+
+    kwargs : parametros de baixa
+
+    Returns
+    -------
+    io.BytesIO com o conteudo da url
+
+    """
+
+    return io.BytesIO(baixa(url, **kwargs))
+
+
+def arquivo(url, caminho, offline=None, timeout=TIMEOUT):
+    """
+
+    Grava o arquivo da url em um caminho fixo, fora do cache com tamanho
+    maximo (nao e removido enquanto outros processos o leem). O download e
+    copiado em blocos para o disco, sem passar todo o conteudo pela memoria, e
+    revalidado pelo ETag/Last-Modified gravados em caminho + '.json'
+
+    Parameters
+    ----------
+    url : string
+          endereco consultado
+
+    caminho : string
+              arquivo gravado
+
+    offline : bool
+              usa somente o arquivo ja gravado, sem acessar a internet. Se None
+              usa a variavel de ambiente FIN_OFFLINE
+
+    timeout : int
+              tempo maximo da consulta em segundos
+
+    Returns
+    -------
+    string com o caminho do arquivo
+
+    """
+
+    offline = OFFLINE if offline is None else offline
+    caminho_entrada = caminho + ".json"
+
+    try:
+        with open(caminho_entrada, encoding="utf-8") as arquivo_entrada:
+            entrada = json.load(arquivo_entrada)
+    except (FileNotFoundError, json.JSONDecodeError):
+        entrada = None
+    if entrada is not None and not os.path.exists(caminho):
+        entrada = None
+
+    if offline:
+        if entrada is None:
+            raise ErroOffline("Modo offline: {} não foi gravado".format(url))
+        return caminho
+
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = "{}.{}.tmp".format(caminho, threading.get_ident())
+    try:
+        with urllib.request.urlopen(_requisicao(url, entrada), timeout=timeout) as resposta:
+            with open(temporario, "wb") as arquivo_temporario:
+                shutil.copyfileobj(resposta, arquivo_temporario, TAMANHO_BLOCO)
+            cabecalhos = resposta.headers
+
+    except urllib.error.HTTPError as erro:
+        if erro.code == 304 and entrada is not None:
+            return caminho
+        raise
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    # o arquivo e trocado antes da entrada, que so descreve arquivos completos
+    os.replace(temporario, caminho)
+    with open(caminho_entrada + ".tmp", "w", encoding="utf-8") as arquivo_entrada:
+        json.dump({"etag": cabecalhos.get("ETag"),
+                   "last_modified": cabecalhos.get("Last-Modified")}, arquivo_entrada)
+    os.replace(caminho_entrada + ".tmp", caminho_entrada)
+
+    return caminho
+
+
+def ultima_modificacao(url, diretorio=DIR_CACHE):
+    """
+
+    Last-Modified (ou ETag) da ultima resposta do servidor para a url
+
+    Parameters
+    ----------
+    url : string
+          endereco consultado
+
+    diretorio : string
+                pasta do cache
+
+    Returns
+    -------
+    string com a versao do arquivo no servidor ou None se a url nao esta no cache
+
+    """
+
+    with _trava:
+        entrada = _le_indice(diretorio).get(url)
+    if entrada is None:
+        return None
+    return entrada.get("last_modified") or entrada.get("etag")
+
+
+def _conteudo_cache(url, caminho, diretorio):
+    """ le o arquivo do cache e registra o acesso para o descarte LRU """
+
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+
+    with _trava:
+        indice = _le_indice(diretorio)
+        if url in indice:
+            indice[url]["acesso"] = time.time()
+            _grava_indice(indice, diretorio)
+
+    return conteudo
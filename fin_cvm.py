@@ -0,0 +1,1642 @@
+"""
+
+Acesso aos dados da CVM com armazenamento local
+
+Base de Dados CVM:
+http://dados.cvm.gov.br/
+
+DADOS DIARIOS - MES
+http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/
+
+DADOS DIARIOS - HISTORICO ANUAL
+http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/HIST/
+
+CADASTRO CVM
+http://dados.cvm.gov.br/dados/FI/CAD/DADOS/cad_fi.csv
+
+Os informes diarios sao gravados em disco particionados por ano e mes, em
+formato colunar comprimido (parquet):
+
+    dados/inf_diario/ano=2023/mes=01/informe.parquet
+
+Os meses passados nao mudam na CVM, portanto somente os meses ausentes e os
+meses ainda abertos (republicados diariamente pela CVM) sao baixados. Os meses
+antigos, que a CVM publica somente nos arquivos anuais do HIST, sao extraidos
+desses arquivos em paralelo (em processos na linha de comando, em threads nas
+demais chamadas). Os arquivos anuais ficam em:
+
+    dados/hist/inf_diario_fi_<ano>.zip
+
+Historico de varios anos em um comando:
+
+    python fin_cvm.py historico 2014 2023
+
+O cadastro e lido uma vez por versao do arquivo da CVM e gravado em parquet:
+
+    dados/cadastro/cad_fi_<versao>.parquet
+
+Informes de varias fontes (armazenamento local e csv gravados a mao) sao
+unidos em um unico dataset versionado pelo hash do conteudo:
+
+    dados/dataset/informes_<versao>.parquet
+    dados/dataset/informes_<versao>.json
+
+"""
+
+import hashlib
+import io
+import argparse
+import json
+import os
+import re
+import time
+import urllib.error
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fin_cache import ErroOffline, arquivo, baixa, ultima_modificacao
+from fin_indices import chaves_cnpj
+
+URL_INF_DIARIO = "http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/inf_diario_fi_{}{:02d}.zip"
+URL_INF_DIARIO_HIST = "http://dados.cvm.gov.br/dados/FI/DOC/INF_DIARIO/DADOS/HIST/inf_diario_fi_{}.zip"
+URL_CADASTRO = "http://dados.cvm.gov.br/dados/FI/CAD/DADOS/cad_fi.csv"
+
+DIR_DADOS = "dados"
+DIR_INF_DIARIO = os.path.join(DIR_DADOS, "inf_diario")
+DIR_CADASTRO = os.path.join(DIR_DADOS, "cadastro")
+DIR_DATASET = os.path.join(DIR_DADOS, "dataset")
+DIR_HIST = os.path.join(DIR_DADOS, "hist")
+
+# quantidade de meses recentes ainda republicados pela CVM (mes atual e anterior)
+MESES_ABERTOS = 2
+
+# parametros do download dos meses
+MAX_CONEXOES = 4
+TENTATIVAS = 3
+ESPERA = 1.0
+TIMEOUT = 60
+
+# trabalhadores usados na extracao dos arquivos anuais (processos somente na
+# linha de comando, ver importa_hist)
+PROCESSOS = os.cpu_count()
+
+# linhas lidas por vez na leitura dos arquivos csv
+TAMANHO_BLOCO = 200000
+
+# nomes das colunas no leiaute novo da CVM (fundos com classes) no leiaute antigo
+COLUNAS_CVM = {"CNPJ_FUNDO_CLASSE": "CNPJ_FUNDO",
+               "TP_FUNDO_CLASSE": "TP_FUNDO"}
+
+# situacoes dos fundos em funcionamento
+SITUACOES_ATIVAS = ["EM FUNCIONAMENTO NORMAL", "FASE PRÉ-OPERACIONAL"]
+
+# colunas do cadastro com poucos valores distintos, gravadas como categorias
+CATEGORIAS_CADASTRO = ["TP_FUNDO", "SIT", "CLASSE", "RENTAB_FUNDO", "CONDOM",
+                       "FUNDO_COTAS", "FUNDO_EXCLUSIVO", "TRIB_LPRAZO", "PUBLICO_ALVO",
+                       "ENTID_INVEST", "PF_PJ_GESTOR", "INVEST_CEMPR_EXTER",
+                       "CLASSE_ANBIMA", "ADMIN", "GESTOR"]
+
+# tipos compactos das colunas dos informes, DT_COMPTC vira datetime64
+# valores financeiros em float32 (precisao de ~7 digitos), a quota fica em float64
+TIPOS_INFORMES = {"TP_FUNDO": "category",
+                  "CNPJ_FUNDO": "category",
+                  "ID_SUBCLASSE": "category",
+                  "VL_TOTAL": "float32",
+                  "VL_QUOTA": "float64",
+                  "VL_PATRIM_LIQ": "float32",
+                  "CAPTC_DIA": "float32",
+                  "RESG_DIA": "float32"}
+
+
+# funcoes do armazenamento local particionado por ano/mes
+
+def caminho_mes(ano, mes, diretorio=DIR_INF_DIARIO):
+    """
+
+    Caminho do arquivo parquet de um mes no armazenamento local
+
+    Parameters
+    ----------
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    diretorio : string
+                raiz do armazenamento local
+
+    Returns
+    -------
+    string com o caminho do arquivo
+
+    """
+
+    return os.path.join(diretorio,
+                        "ano={}".format(ano),
+                        "mes={:02d}".format(mes),
+                        "informe.parquet")
+
+
+def meses_armazenados(diretorio=DIR_INF_DIARIO):
+    """
+
+    Lista os meses ja gravados no armazenamento local
+
+    Parameters
+    ----------
+    diretorio : string
+                raiz do armazenamento local
+
+    Returns
+    -------
+    set com tuplas (ano, mes)
+
+    """
+
+    meses = set()
+    if not os.path.isdir(diretorio):
+        return meses
+
+    for pasta_ano in os.listdir(diretorio):
+        if not pasta_ano.startswith("ano="):
+            continue
+        ano = int(pasta_ano[4:])
+        for pasta_mes in os.listdir(os.path.join(diretorio, pasta_ano)):
+            if not pasta_mes.startswith("mes="):
+                continue
+            mes = int(pasta_mes[4:])
+            if os.path.exists(caminho_mes(ano, mes, diretorio)):
+                meses.add((ano, mes))
+
+    return meses
+
+
+def mes_aberto(ano, mes, hoje=None):
+    """
+
+    Indica se o mes ainda pode ser republicado pela CVM
+
+    Parameters
+    ----------
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    hoje : data
+           data de referencia, padrao hoje
+
+    Returns
+    -------
+    True se o mes esta entre os MESES_ABERTOS mais recentes
+
+    """
+
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    limite = hoje.to_period("M") - (MESES_ABERTOS - 1)
+    return pd.Period(year=ano, month=mes, freq="M") >= limite
+
+
+def grava_mes(informe_mensal, ano, mes, diretorio=DIR_INF_DIARIO):
+    """
+
+    Grava o informe de um mes no armazenamento local
+
+    Parameters
+    ----------
+    informe_mensal : DataFrame
+                     informe diario do mes
+
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    diretorio : string
+                raiz do armazenamento local
+
+    Returns
+    -------
+    string com o caminho do arquivo gravado
+
+    """
+
+    caminho = caminho_mes(ano, mes, diretorio)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+    # grava em arquivo temporario e renomeia para nao deixar meses incompletos
+    temporario = caminho + ".tmp"
+    informe_mensal.to_parquet(temporario, index=False, compression="zstd")
+    os.replace(temporario, caminho)
+
+    return caminho
+
+
+def le_mes(ano, mes, diretorio=DIR_INF_DIARIO, colunas=None, filtros=None):
+    """
+
+    Le o informe de um mes do armazenamento local
+
+    Parameters
+    ----------
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    diretorio : string
+                raiz do armazenamento local
+
+    colunas : list
+              colunas desejadas, se None todas as colunas
+
+    filtros : list
+              filtros aplicados na leitura, ver filtros_informes
+
+    Returns
+    -------
+    Pandas DataFrame com o informe do mes
+
+    """
+
+    caminho = caminho_mes(ano, mes, diretorio)
+
+    # DT_COMPTC gravada como datetime64 e comparada como data, meses gravados
+    # antes da tipagem guardam DT_COMPTC como texto
+    if filtros and pq.read_schema(caminho).field("DT_COMPTC").type != "string":
+        filtros = [(nome, operacao, pd.Timestamp(valor) if nome == "DT_COMPTC" else valor)
+                   for nome, operacao, valor in filtros]
+
+    return tipa_informes(pd.read_parquet(caminho, columns=colunas, filters=filtros))
+
+
+def linhas_mes(ano, mes, diretorio=DIR_INF_DIARIO):
+    """
+
+    Numero de linhas de um mes gravado, lido somente dos metadados do arquivo
+
+    Parameters
+    ----------
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    diretorio : string
+                raiz do armazenamento local
+
+    Returns
+    -------
+    int com o numero de linhas
+
+    """
+
+    return pq.ParquetFile(caminho_mes(ano, mes, diretorio)).metadata.num_rows
+
+
+# funcoes de tipagem dos informes
+
+def tipa_informes(informe):
+    """
+
+    Converte o informe para tipos compactos: CNPJ e tipo de fundo como
+    categorias, DT_COMPTC como datetime64 (convertida uma vez por data
+    distinta) e colunas numericas reduzidas
+
+    Parameters
+    ----------
+    informe : DataFrame
+              informe diario no formato da CVM
+
+    Returns
+    -------
+    Pandas DataFrame com os tipos compactos
+
+    """
+
+    informe = informe.copy(deep=False)
+    for nome in informe.columns:
+        if nome == "DT_COMPTC":
+            informe[nome] = _converte_datas(informe[nome])
+        elif nome == "NR_COTST":
+            # float32 em todos os meses (com ou sem NaN), mesmo esquema no parquet
+            informe[nome] = pd.to_numeric(informe[nome]).astype("float32")
+        elif nome in TIPOS_INFORMES and informe[nome].dtype != TIPOS_INFORMES[nome]:
+            informe[nome] = informe[nome].astype(TIPOS_INFORMES[nome])
+
+    return informe
+
+
+def relatorio_memoria(antes, depois):
+    """
+
+    Compara a memoria ocupada por coluna de dois DataFrames
+
+    Parameters
+    ----------
+    antes : DataFrame
+            informes no leiaute original (texto)
+
+    depois : DataFrame
+             informes tipados
+
+    Returns
+    -------
+    Pandas DataFrame com a memoria em MB de cada coluna e a reducao
+
+    """
+
+    relatorio = pd.DataFrame({"Antes(MB)": antes.memory_usage(deep=True, index=False),
+                              "Depois(MB)": depois.memory_usage(deep=True, index=False)})
+    relatorio.loc["Total"] = relatorio.sum()
+    relatorio = relatorio / 2**20
+    relatorio["Reducao(x)"] = relatorio["Antes(MB)"] / relatorio["Depois(MB)"]
+    return relatorio.round(2)
+
+
+def _converte_datas(serie):
+    """ converte datas em texto para datetime64 uma vez por valor distinto """
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    categorias = serie if isinstance(serie.dtype, pd.CategoricalDtype) \
+        else serie.astype("category")
+    datas = pd.to_datetime(categorias.cat.categories, format="%Y-%m-%d").to_numpy()
+    datas = np.append(datas, np.datetime64("NaT"))
+    return pd.Series(datas[categorias.cat.codes.to_numpy()], index=serie.index)
+
+
+# funcoes de montagem dos informes
+
+def itera_informes(meses, diretorio=DIR_INF_DIARIO, colunas=None, filtros=None):
+    """
+
+    Le os meses do armazenamento local um a um
+
+    Parameters
+    ----------
+    meses : list
+            tuplas (ano, mes) gravadas no armazenamento local
+
+    diretorio : string
+                raiz do armazenamento local
+
+    colunas : list
+              colunas desejadas, se None todas as colunas
+
+    filtros : list
+              filtros aplicados na leitura, ver filtros_informes
+
+    Returns
+    -------
+    Gerador com um DataFrame por mes
+
+    """
+
+    for ano, mes in meses:
+        yield le_mes(ano, mes, diretorio, colunas, filtros)
+
+
+def monta_informes(blocos, total_linhas=None):
+    """
+
+    Monta o DataFrame final copiando cada bloco uma unica vez para colunas
+    alocadas previamente, evitando o pd.concat acumulado a cada mes
+
+    Parameters
+    ----------
+    blocos : iterable
+             DataFrames com as mesmas colunas (um por mes)
+
+    total_linhas : int
+                   soma das linhas de todos os blocos, se None os blocos sao
+                   lidos antes para conta-las
+
+    Returns
+    -------
+    Pandas DataFrame com todos os blocos
+
+    """
+
+    if total_linhas is None:
+        blocos = list(blocos)
+        total_linhas = sum(len(bloco) for bloco in blocos)
+
+    colunas = {}
+    categorias = {}
+    inicio = 0
+    for bloco in blocos:
+        fim = inicio + len(bloco)
+        for nome in bloco.columns:
+            valores = bloco[nome]
+
+            # categorias sao gravadas como codigos sobre a uniao das categorias
+            if isinstance(valores.dtype, pd.CategoricalDtype) and \
+                    (nome in categorias or nome not in colunas):
+                valores = _recodifica(valores, categorias.setdefault(nome, {}))
+            elif nome in categorias:
+                _descodifica(colunas, categorias, nome, inicio)
+            valores = np.asarray(valores)
+
+            if nome not in colunas:
+                colunas[nome] = np.empty(total_linhas, dtype=valores.dtype)
+                if inicio:
+                    _preenche_ausentes(colunas, categorias, nome, 0, inicio)
+
+            # promove o tipo da coluna se o mes trouxer outro tipo (ex.: int e float)
+            tipo = np.result_type(colunas[nome].dtype, valores.dtype)
+            if tipo != colunas[nome].dtype:
+                colunas[nome] = colunas[nome].astype(tipo)
+
+            colunas[nome][inicio:fim] = valores
+
+        # colunas que nao existem neste mes ficam como NaN
+        for nome in colunas.keys() - set(bloco.columns):
+            _preenche_ausentes(colunas, categorias, nome, inicio, fim)
+
+        inicio = fim
+
+    for nome, valores in categorias.items():
+        colunas[nome] = pd.Categorical.from_codes(colunas[nome], categories=list(valores))
+
+    return pd.DataFrame(colunas, copy=False)
+
+
+def _recodifica(serie, categorias):
+    """ codigos da serie categorica na uniao das categorias ja vistas """
+
+    for categoria in serie.cat.categories:
+        categorias.setdefault(categoria, len(categorias))
+    mapa = np.array([categorias[categoria] for categoria in serie.cat.categories] + [-1],
+                    dtype=np.int32)
+    return mapa[serie.cat.codes.to_numpy()]
+
+
+def _descodifica(colunas, categorias, nome, inicio):
+    """ volta a coluna categorica para valores quando um mes nao e categorico """
+
+    # somente as linhas ja copiadas (antes de inicio) tem codigos validos
+    valores = np.array(list(categorias.pop(nome)) + [np.nan], dtype=object)
+    descodificada = np.empty(len(colunas[nome]), dtype=object)
+    descodificada[:inicio] = valores[colunas[nome][:inicio]]
+    colunas[nome] = descodificada
+
+
+def _preenche_ausentes(colunas, categorias, nome, inicio, fim):
+    """ preenche com NaN as linhas de um trecho sem a coluna """
+
+    if nome in categorias:
+        colunas[nome][inicio:fim] = -1
+        return
+
+    if colunas[nome].dtype.kind in "biu":
+        colunas[nome] = colunas[nome].astype(float)
+    elif colunas[nome].dtype.kind not in "fcOM":
+        colunas[nome] = colunas[nome].astype(object)
+    colunas[nome][inicio:fim] = np.datetime64("NaT") if colunas[nome].dtype.kind == "M" else np.nan
+
+
+# funcoes de filtro aplicadas durante a leitura
+
+def filtros_informes(cnpjs=None, data_minima=None, data_maxima=None, minimo_cotista=None):
+    """
+
+    Filtros dos informes no formato aceito pelo parquet (pyarrow)
+
+    Parameters
+    ----------
+    cnpjs : list
+            cnpj dos fundos desejados, se None todos os fundos
+
+    data_minima : data
+                  YYYY-MM-DD, primeira data desejada
+
+    data_maxima : data
+                  YYYY-MM-DD, ultima data desejada
+
+    minimo_cotista : int
+                     fundos com minimo numero de cotista
+
+    Returns
+    -------
+    list de tuplas (coluna, operacao, valor) ou None se nao ha filtro
+
+    """
+
+    filtros = []
+    if cnpjs is not None:
+        filtros.append(("CNPJ_FUNDO", "in", list(cnpjs)))
+    if data_minima is not None:
+        filtros.append(("DT_COMPTC", ">=", _texto_data(data_minima)))
+    if data_maxima is not None:
+        filtros.append(("DT_COMPTC", "<=", _texto_data(data_maxima)))
+    if minimo_cotista is not None:
+        filtros.append(("NR_COTST", ">=", minimo_cotista))
+
+    return filtros or None
+
+
+def le_informe_csv(fonte, colunas=None, filtros=None, compressao="infer",
+                   tamanho_bloco=TAMANHO_BLOCO):
+    """
+
+    Le um arquivo csv de informes diarios em blocos, aplicando a selecao de
+    colunas e os filtros durante a leitura
+
+    CNPJ e datas sao lidos como categorias enquanto os filtros sao aplicados,
+    assim as linhas descartadas nao viram strings do Python. O resultado tem
+    os tipos compactos de tipa_informes.
+
+    Parameters
+    ----------
+    fonte : string ou arquivo
+            caminho, url ou buffer do csv (separado por ';')
+
+    colunas : list
+              colunas desejadas, se None todas as colunas
+
+    filtros : list
+              filtros aplicados na leitura, ver filtros_informes
+
+    compressao : string
+                 compressao do arquivo ('zip', None ou 'infer')
+
+    tamanho_bloco : int
+                    linhas lidas por vez
+
+    Returns
+    -------
+    Pandas DataFrame com as linhas e colunas selecionadas
+
+    """
+
+    filtros = filtros or []
+
+    # colunas lidas: as desejadas e as usadas nos filtros
+    necessarias = None
+    if colunas is not None:
+        necessarias = set(colunas) | {coluna for coluna, _, _ in filtros}
+
+    def usa_coluna(nome):
+        return necessarias is None or COLUNAS_CVM.get(nome, nome) in necessarias
+
+    categorias = {}
+    for nome in ("CNPJ_FUNDO", "DT_COMPTC"):
+        categorias[nome] = "category"
+        categorias.update({original: "category"
+                           for original, novo in COLUNAS_CVM.items() if novo == nome})
+
+    leitor = pd.read_csv(fonte, sep=";", usecols=usa_coluna, dtype=categorias,
+                         compression=compressao, chunksize=tamanho_bloco)
+
+    blocos = []
+    with leitor:
+        for bloco in leitor:
+            bloco = bloco.rename(columns=COLUNAS_CVM)
+            if filtros:
+                bloco = bloco[_aplica_filtros(bloco, filtros)]
+            if colunas is not None:
+                bloco = bloco[list(colunas)]
+            blocos.append(tipa_informes(bloco))
+
+    return monta_informes(blocos)
+
+
+def _aplica_filtros(bloco, filtros):
+    """ mascara das linhas do bloco que atendem todos os filtros """
+
+    mascara = np.ones(len(bloco), dtype=bool)
+    for nome, operacao, valor in filtros:
+        serie = bloco[nome]
+
+        # colunas categoricas sao comparadas somente nas categorias
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            categorias = pd.Series(serie.cat.categories)
+            codigos = serie.cat.codes.to_numpy()
+            resultado = np.append(_compara(categorias, operacao, valor).to_numpy(), False)
+            mascara &= resultado[codigos]
+        else:
+            mascara &= _compara(serie, operacao, valor).to_numpy()
+
+    return mascara
+
+
+def _compara(serie, operacao, valor):
+    if operacao == "in":
+        return serie.isin(valor)
+    if operacao == ">=":
+        return serie >= valor
+    if operacao == "<=":
+        return serie <= valor
+    raise ValueError("Operacao {} nao suportada".format(operacao))
+
+
+def _texto_data(data):
+    return pd.Timestamp(data).strftime("%Y-%m-%d")
+
+
+# funcoes de consulta na CVM
+
+def baixa_mes(ano, mes, url=URL_INF_DIARIO, tentativas=TENTATIVAS, espera=ESPERA):
+    """
+
+    Baixa o informe diario de um mes na CVM, com novas tentativas em caso de
+    falha e espera crescente entre elas
+
+    Parameters
+    ----------
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    url : string
+          modelo da url dos arquivos mensais
+
+    tentativas : int
+                 numero maximo de tentativas
+
+    espera : float
+             espera em segundos antes da segunda tentativa, dobrada a cada nova
+             tentativa
+
+    Returns
+    -------
+    Pandas DataFrame com o informe do mes
+
+    """
+
+    endereco = url.format(ano, mes)
+    compressao = "zip" if endereco.endswith(".zip") else None
+
+    for tentativa in range(tentativas):
+        try:
+            conteudo = baixa(endereco, timeout=TIMEOUT)
+            return le_informe_csv(io.BytesIO(conteudo), compressao=compressao)
+
+        except ErroOffline:
+            raise
+
+        except urllib.error.HTTPError as erro:
+            # arquivo inexistente na CVM, nao adianta tentar novamente
+            if erro.code == 404 or tentativa == tentativas - 1:
+                raise
+
+        except Exception:
+            if tentativa == tentativas - 1:
+                raise
+
+        time.sleep(espera * 2 ** tentativa)
+
+
+def baixa_meses(meses, url=URL_INF_DIARIO, max_conexoes=MAX_CONEXOES,
+                tentativas=TENTATIVAS, espera=ESPERA):
+    """
+
+    Baixa varios meses em paralelo com numero limitado de conexoes
+
+    Parameters
+    ----------
+    meses : list
+            tuplas (ano, mes) solicitadas
+
+    url : string
+          modelo da url dos arquivos mensais
+
+    max_conexoes : int
+                   numero maximo de downloads simultaneos
+
+    tentativas : int
+                 numero maximo de tentativas por mes
+
+    espera : float
+             espera inicial em segundos entre tentativas
+
+    Returns
+    -------
+    Gerador de tuplas ((ano, mes), informe, erro), com informe None se o mes
+    falhou e erro None se o mes foi baixado
+
+    """
+
+    if not meses:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_conexoes) as executor:
+        tarefas = {executor.submit(baixa_mes, ano, mes, url, tentativas, espera): (ano, mes)
+                   for ano, mes in meses}
+
+        for tarefa in as_completed(tarefas):
+            chave = tarefas[tarefa]
+            try:
+                informe_mensal, erro = tarefa.result(), None
+            except Exception as falha:
+                informe_mensal, erro = None, falha
+            yield chave, informe_mensal, erro
+
+
+def atualiza_informes(datas, diretorio=DIR_INF_DIARIO, atualiza_abertos=True,
+                      url=URL_INF_DIARIO, max_conexoes=MAX_CONEXOES,
+                      url_hist=URL_INF_DIARIO_HIST, processos=0):
+    """
+
+    Baixa da CVM somente os meses que nao estao no armazenamento local. Os
+    meses sem arquivo mensal (404) sao procurados nos arquivos anuais do HIST
+
+    Parameters
+    ----------
+    datas : DatetimeIndex
+            meses solicitados
+
+    diretorio : string
+                raiz do armazenamento local
+
+    atualiza_abertos : bool
+                       baixa novamente os meses ainda republicados pela CVM
+
+    url : string
+          modelo da url dos arquivos mensais
+
+    max_conexoes : int
+                   numero maximo de downloads simultaneos
+
+    url_hist : string
+               modelo da url dos arquivos anuais, se None nao usa o HIST
+
+    processos : int
+                processos usados na extracao dos arquivos anuais, se 0 extrai
+                em threads no proprio processo (ver importa_hist)
+
+    Returns
+    -------
+    1. list com as tuplas (ano, mes) baixadas
+    2. dict com as tuplas (ano, mes) que falharam e o erro de cada uma
+
+    """
+
+    armazenados = meses_armazenados(diretorio)
+
+    pendentes = [(data.year, data.month) for data in datas
+                 if (data.year, data.month) not in armazenados
+                 or (atualiza_abertos and mes_aberto(data.year, data.month))]
+
+    baixados = []
+    falhas = {}
+    for chave, informe_mensal, erro in baixa_meses(pendentes, url, max_conexoes):
+        if erro is not None:
+            falhas[chave] = erro
+            continue
+
+        grava_mes(informe_mensal, *chave, diretorio=diretorio)
+        baixados.append(chave)
+
+    # meses publicados somente no arquivo anual
+    sem_arquivo = [chave for chave, erro in falhas.items()
+                   if isinstance(erro, urllib.error.HTTPError) and erro.code == 404]
+    falhas_hist = {}
+    if url_hist is not None and sem_arquivo:
+        importados, falhas_hist = importa_hist(sem_arquivo, diretorio, url_hist, processos)
+        for chave in importados:
+            del falhas[chave]
+        falhas.update(falhas_hist)
+        baixados.extend(importados)
+
+    # relatorio dos meses nao baixados, com a url que falhou (mensal ou anual)
+    for chave, erro in sorted(falhas.items()):
+        origem = url_hist.format(chave[0]) if chave in falhas_hist else url.format(*chave)
+        print("Arquivo {} não encontrado! ({})".format(origem, erro))
+    if falhas:
+        print("Forneça outra data!")
+
+    return sorted(baixados), falhas
+
+
+def carrega_informes(data_inicio, data_fim, diretorio=DIR_INF_DIARIO, colunas=None,
+                     cnpjs=None, data_minima=None, data_maxima=None, minimo_cotista=None,
+                     atualiza_abertos=True, url=URL_INF_DIARIO, max_conexoes=MAX_CONEXOES,
+                     url_hist=URL_INF_DIARIO_HIST, processos=0):
+    """
+
+    Informes diarios do periodo a partir do armazenamento local, baixando da
+    CVM somente os meses ausentes
+
+    Parameters
+    ----------
+    data_inicio : data
+                  YYYY-MM
+
+    data_fim : data
+                  YYYY-MM
+
+    diretorio : string
+                raiz do armazenamento local
+
+    colunas : list
+              colunas desejadas, se None todas as colunas
+
+    cnpjs : list
+            cnpj dos fundos desejados, se None todos os fundos
+
+    data_minima : data
+                  YYYY-MM-DD, descarta as datas anteriores
+
+    data_maxima : data
+                  YYYY-MM-DD, descarta as datas posteriores
+
+    minimo_cotista : int
+                     descarta as linhas com menos cotistas
+
+    atualiza_abertos : bool
+                       baixa novamente os meses ainda republicados pela CVM
+
+    url : string
+          modelo da url dos arquivos mensais
+
+    max_conexoes : int
+                   numero maximo de downloads simultaneos
+
+    url_hist : string
+               modelo da url dos arquivos anuais, se None nao usa o HIST
+
+    processos : int
+                processos usados na extracao dos arquivos anuais, se 0 extrai
+                em threads no proprio processo (ver importa_hist)
+
+    Returns
+    -------
+    Pandas DataFrame com as informacoes mensais de rendimento dos fundos
+    no periodo solitado
+
+    """
+
+    # datas de solicitacao dos arquivos
+    datas = pd.date_range(data_inicio, data_fim, freq="MS")
+
+    atualiza_informes(datas, diretorio, atualiza_abertos, url, max_conexoes,
+                      url_hist, processos)
+
+    # meses que falharam ficam de fora, nunca sao repetidos de outro mes
+    armazenados = meses_armazenados(diretorio)
+    meses = [(data.year, data.month) for data in datas
+             if (data.year, data.month) in armazenados]
+
+    if not meses:
+        return pd.DataFrame(columns=colunas)
+
+    # colunas e filtros sao aplicados na leitura de cada mes
+    filtros = filtros_informes(cnpjs, data_minima, data_maxima, minimo_cotista)
+    blocos = itera_informes(meses, diretorio, colunas, filtros)
+
+    # sem filtros o total de linhas vem dos metadados e as colunas sao alocadas antes
+    total_linhas = None
+    if filtros is None:
+        total_linhas = sum(linhas_mes(ano, mes, diretorio) for ano, mes in meses)
+
+    return monta_informes(blocos, total_linhas)
+
+
+# funcoes dos arquivos anuais (HIST)
+
+def membros_hist(caminho_zip):
+    """
+
+    Arquivos mensais dentro de um arquivo anual do HIST
+
+    Parameters
+    ----------
+    caminho_zip : string
+                  arquivo anual inf_diario_fi_YYYY.zip
+
+    Returns
+    -------
+    dict {(ano, mes): nome do arquivo mensal no zip}
+
+    """
+
+    membros = {}
+    with zipfile.ZipFile(caminho_zip) as arquivo_zip:
+        for nome in arquivo_zip.namelist():
+            encontrado = re.search(r"(\d{4})(\d{2})\.csv$", nome)
+            if encontrado:
+                membros[(int(encontrado.group(1)), int(encontrado.group(2)))] = nome
+    return membros
+
+
+def extrai_membro(caminho_zip, membro, ano, mes, diretorio=DIR_INF_DIARIO):
+    """
+
+    Le um mes de um arquivo anual e grava no armazenamento local, executada
+    em paralelo por importa_hist
+
+    Parameters
+    ----------
+    caminho_zip : string
+                  arquivo anual inf_diario_fi_YYYY.zip
+
+    membro : string
+             nome do arquivo mensal no zip
+
+    ano : int
+          YYYY
+
+    mes : int
+          MM
+
+    diretorio : string
+                raiz do armazenamento local
+
+    Returns
+    -------
+    int com o numero de linhas gravadas
+
+    """
+
+    with zipfile.ZipFile(caminho_zip) as arquivo_zip, arquivo_zip.open(membro) as arquivo_csv:
+        informe_mensal = le_informe_csv(arquivo_csv, compressao=None)
+    grava_mes(informe_mensal, ano, mes, diretorio)
+    return len(informe_mensal)
+
+
+def importa_hist(meses, diretorio=DIR_INF_DIARIO, url_hist=URL_INF_DIARIO_HIST,
+                 processos=0, diretorio_hist=DIR_HIST):
+    """
+
+    Importa meses dos arquivos anuais do HIST para o armazenamento local,
+    extraindo os meses de cada ano em paralelo
+
+    Processos somente sao usados quando pedidos (linha de comando): nas
+    plataformas que iniciam os processos com spawn (macOS, Windows) cada
+    processo importa de novo o modulo principal, e os scripts que chamam
+    carrega_informes no nivel do modulo seriam executados outra vez
+
+    Parameters
+    ----------
+    meses : list
+            tuplas (ano, mes) desejadas
+
+    diretorio : string
+                raiz do armazenamento local
+
+    url_hist : string
+               modelo da url dos arquivos anuais
+
+    processos : int
+                numero de processos da extracao, se 0 extrai em PROCESSOS
+                threads no proprio processo
+
+    diretorio_hist : string
+                     pasta dos arquivos anuais, fora do cache com tamanho
+                     maximo para que nao sejam removidos durante a extracao
+
+    Returns
+    -------
+    1. list com as tuplas (ano, mes) importadas
+    2. dict com as tuplas (ano, mes) que falharam e o erro de cada uma
+
+    """
+
+    importados = []
+    falhas = {}
+
+    executor = ProcessPoolExecutor(max_workers=processos) if processos \
+        else ThreadPoolExecutor(max_workers=PROCESSOS)
+    with executor:
+        tarefas = {}
+        for ano in sorted({ano for ano, _ in meses}):
+            desejados = [(ano_mes, mes) for ano_mes, mes in meses if ano_mes == ano]
+            try:
+                url_ano = url_hist.format(ano)
+                caminho_zip = arquivo(url_ano, os.path.join(diretorio_hist,
+                                                            os.path.basename(url_ano)),
+                                      timeout=TIMEOUT)
+                membros = membros_hist(caminho_zip)
+            except Exception as erro:
+                falhas.update({chave: erro for chave in desejados})
+                continue
+
+            for chave in desejados:
+                if chave not in membros:
+                    falhas[chave] = KeyError("{}{:02d} fora do arquivo anual".format(*chave))
+                    continue
+                tarefa = executor.submit(extrai_membro, caminho_zip, membros[chave],
+                                         *chave, diretorio)
+                tarefas[tarefa] = chave
+
+        for tarefa in as_completed(tarefas):
+            chave = tarefas[tarefa]
+            try:
+                tarefa.result()
+                importados.append(chave)
+            except Exception as erro:
+                falhas[chave] = erro
+
+    return sorted(importados), falhas
+
+
+# funcoes do cadastro de fundos
+
+def carrega_cadastro(colunas=None, ativos=False, url=URL_CADASTRO, diretorio=DIR_CADASTRO):
+    """
+
+    Cadastro de fundos da CVM a partir de uma copia local em parquet
+
+    O cad_fi.csv e revalidado pelo cache HTTP e lido somente quando muda na
+    CVM: a leitura completa e gravada em parquet identificado pela versao do
+    arquivo (Last-Modified). As visoes de fundos ativos e completa vem da mesma
+    copia, lendo somente as colunas solicitadas.
+
+    Parameters
+    ----------
+    colunas : list
+              colunas desejadas, se None todas as colunas
+
+    ativos : bool
+             somente fundos em funcionamento (SITUACOES_ATIVAS)
+
+    url : string
+          endereco do cad_fi.csv
+
+    diretorio : string
+                pasta das copias em parquet
+
+    Returns
+    -------
+    Pandas DataFrame com um registro por CNPJ_FUNDO (index), o registro mais
+    recente (DT_REG, depois DT_INI_SIT) quando o CNPJ aparece mais de uma vez
+
+    """
+
+    caminho = _copia_cadastro(url, diretorio)
+
+    lidas = None
+    if colunas is not None:
+        lidas = list(dict.fromkeys(["CNPJ_FUNDO", "SIT", "DT_REG", "DT_INI_SIT"]
+                                   + list(colunas)))
+    cadastro = pd.read_parquet(caminho, columns=lidas)
+
+    # seleciona fundos em funcionamemto antes de retirar os duplicados
+    if ativos:
+        cadastro = cadastro[cadastro["SIT"].isin(SITUACOES_ATIVAS)]
+
+    # retira duplicados: o registro mais recente de cada cnpj
+    cadastro = (cadastro
+                .sort_values(["DT_REG", "DT_INI_SIT"], kind="stable", na_position="first")
+                .drop_duplicates("CNPJ_FUNDO", keep="last")
+                .set_index("CNPJ_FUNDO")
+                .sort_index())
+
+    if colunas is not None:
+        cadastro = cadastro[[coluna for coluna in colunas if coluna != "CNPJ_FUNDO"]]
+
+    return cadastro
+
+
+def _copia_cadastro(url, diretorio):
+    """ caminho da copia em parquet da versao atual do cadastro, gravada se preciso """
+
+    conteudo = baixa(url)
+    versao = ultima_modificacao(url) or hashlib.sha1(conteudo).hexdigest()
+    caminho = os.path.join(
+        diretorio, "cad_fi_{}.parquet".format(hashlib.sha1(versao.encode()).hexdigest()[:16]))
+
+    if os.path.exists(caminho):
+        return caminho
+
+    # transcodifica ISO-8859-1 uma unica vez, na leitura completa
+    cadastro = pd.read_csv(io.BytesIO(conteudo), sep=";", encoding="ISO-8859-1", dtype=str)
+    for nome in cadastro.columns:
+        if nome.startswith("DT_"):
+            cadastro[nome] = pd.to_datetime(cadastro[nome], format="%Y-%m-%d", errors="coerce")
+        elif nome == "VL_PATRIM_LIQ":
+            cadastro[nome] = pd.to_numeric(cadastro[nome], errors="coerce")
+        elif nome in CATEGORIAS_CADASTRO:
+            cadastro[nome] = cadastro[nome].astype("category")
+
+    # remove as copias de versoes anteriores
+    os.makedirs(diretorio, exist_ok=True)
+    for nome_arquivo in os.listdir(diretorio):
+        if nome_arquivo.startswith("cad_fi_"):
+            os.remove(os.path.join(diretorio, nome_arquivo))
+
+    temporario = caminho + ".tmp"
+    cadastro.to_parquet(temporario, index=False, compression="zstd")
+    os.replace(temporario, caminho)
+
+    return caminho
+
+
+# dataset unificado e versionado dos informes
+
+class DatasetInformes:
+    """
+
+    Informes de varias fontes unidos em um unico dataset
+
+    As fontes sao adicionadas em ordem de prioridade: quando o mesmo
+    (CNPJ_FUNDO, DT_COMPTC) aparece em mais de uma fonte fica a linha da fonte
+    adicionada por ultimo. O dataset registra de qual fonte veio cada mes e tem
+    uma versao dada pelo hash do conteudo.
+
+    Examples
+    --------
+    dataset = DatasetInformes()
+    dataset.adiciona_csv('informes_2023.csv')
+    dataset.adiciona_cvm('2023-01-01', '2023-03-31')
+    dataset.grava()
+    informes = DatasetInformes.carrega().informes
+
+    Attributes
+    ----------
+    informes : DataFrame
+               informes ordenados por (CNPJ_FUNDO, DT_COMPTC), sem duplicados
+
+    origens : dict
+              {'YYYY-MM': {fonte: linhas}}
+
+    versao : string
+             hash do conteudo dos informes
+
+    """
+
+    def __init__(self, diretorio=DIR_DATASET):
+        self.diretorio = diretorio
+        self.fontes = []
+        self._blocos = []
+        self._informes = None
+        self._origens = None
+        self._versao = None
+
+    def adiciona(self, informes, fonte):
+        """
+
+        Adiciona informes de uma fonte
+
+        Parameters
+        ----------
+        informes : DataFrame
+                   informes no formato da CVM
+
+        fonte : string
+                nome da fonte registrado nas origens
+
+        Returns
+        -------
+        o proprio dataset
+
+        """
+
+        informes = informes.drop(columns=["Unnamed: 0"], errors="ignore")
+        informes = tipa_informes(informes.rename(columns=COLUNAS_CVM))
+        informes["FONTE"] = np.int16(len(self.fontes))
+
+        self.fontes.append(fonte)
+        self._blocos.append(informes)
+        self._informes = self._origens = self._versao = None
+        return self
+
+    def adiciona_csv(self, caminho, sep=","):
+        """
+
+        Adiciona informes gravados em csv (ex.: informes.to_csv('informes_2023.csv'))
+
+        Parameters
+        ----------
+        caminho : string
+                  arquivo csv
+
+        sep : string
+              separador do csv
+
+        Returns
+        -------
+        o proprio dataset
+
+        """
+
+        return self.adiciona(pd.read_csv(caminho, sep=sep), os.path.basename(caminho))
+
+    def adiciona_cvm(self, data_inicio, data_fim, **kwargs):
+        """
+
+        Adiciona os informes do periodo a partir do armazenamento local
+
+        Parameters
+        ----------
+        data_inicio : data
+                      YYYY-MM
+
+        data_fim : data
+                   YYYY-MM
+
+        kwargs : parametros de carrega_informes
+
+        Returns
+        -------
+        o proprio dataset
+
+        """
+
+        return self.adiciona(carrega_informes(data_inicio, data_fim, **kwargs), "cvm")
+
+    @property
+    def informes(self):
+        if self._informes is None:
+            self._monta()
+        return self._informes
+
+    @property
+    def origens(self):
+        if self._origens is None:
+            self._monta()
+        return self._origens
+
+    @property
+    def versao(self):
+        if self._versao is None:
+            conteudo = pd.util.hash_pandas_object(self.informes, index=False).to_numpy()
+            self._versao = hashlib.sha256(conteudo.tobytes()).hexdigest()[:16]
+        return self._versao
+
+    def _monta(self):
+        """ une as fontes, retira duplicados e registra as origens por mes """
+
+        informes = monta_informes(self._blocos)
+        if informes.empty:
+            self._informes = informes
+            self._origens = {}
+            return
+
+        chaves = chaves_cnpj(informes["CNPJ_FUNDO"])
+        datas = informes["DT_COMPTC"].to_numpy()
+        ordem = np.lexsort((informes["FONTE"].to_numpy(), datas, chaves))
+
+        # fica a ultima linha de cada (cnpj, data), a da fonte de maior prioridade
+        chaves, datas = chaves[ordem], datas[ordem]
+        ultima = np.ones(len(ordem), dtype=bool)
+        ultima[:-1] = (chaves[1:] != chaves[:-1]) | (datas[1:] != datas[:-1])
+        informes = informes.take(ordem[ultima]).reset_index(drop=True)
+
+        meses = informes["DT_COMPTC"].dt.strftime("%Y-%m")
+        linhas = informes.groupby([meses, "FONTE"]).size()
+        self._origens = {}
+        for (mes, fonte), total in linhas.items():
+            self._origens.setdefault(mes, {})[self.fontes[fonte]] = int(total)
+
+        self._informes = informes.drop(columns="FONTE")
+
+    def grava(self):
+        """
+
+        Grava o dataset e o manifesto (fontes, origens e versao)
+
+        Returns
+        -------
+        string com a versao gravada
+
+        """
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, "informes_{}".format(self.versao))
+
+        self.informes.to_parquet(caminho + ".parquet.tmp", index=False, compression="zstd")
+        os.replace(caminho + ".parquet.tmp", caminho + ".parquet")
+
+        manifesto = {"versao": self.versao,
+                     "gravado": pd.Timestamp.today().isoformat(),
+                     "linhas": len(self.informes),
+                     "fontes": self.fontes,
+                     "origens": self.origens}
+        with open(caminho + ".json", "w", encoding="utf-8") as arquivo:
+            json.dump(manifesto, arquivo, indent=2, ensure_ascii=False)
+
+        return self.versao
+
+    @classmethod
+    def carrega(cls, versao=None, diretorio=DIR_DATASET, colunas=None):
+        """
+
+        Le um dataset gravado
+
+        Parameters
+        ----------
+        versao : string
+                 versao desejada, se None a gravada por ultimo
+
+        diretorio : string
+                    pasta dos datasets
+
+        colunas : list
+                  colunas desejadas, se None todas as colunas
+
+        Returns
+        -------
+        DatasetInformes com os informes, fontes, origens e versao gravados
+
+        """
+
+        if versao is None:
+            manifestos = [arquivo for arquivo in os.listdir(diretorio)
+                          if arquivo.startswith("informes_") and arquivo.endswith(".json")]
+            if not manifestos:
+                raise FileNotFoundError("Nenhum dataset gravado em {}".format(diretorio))
+            manifestos.sort(key=lambda arquivo: os.path.getmtime(os.path.join(diretorio, arquivo)))
+            versao = manifestos[-1][len("informes_"):-len(".json")]
+
+        caminho = os.path.join(diretorio, "informes_{}".format(versao))
+        with open(caminho + ".json", encoding="utf-8") as arquivo:
+            manifesto = json.load(arquivo)
+
+        dataset = cls(diretorio)
+        dataset.fontes = manifesto["fontes"]
+        dataset._informes = tipa_informes(pd.read_parquet(caminho + ".parquet", columns=colunas))
+        dataset._origens = manifesto["origens"]
+        dataset._versao = manifesto["versao"]
+        return dataset
+
+
+# consulta preguicosa sobre o armazenamento local
+
+class ConsultaInformes:
+    """
+
+    Consulta dos informes montada em etapas e executada somente no final
+
+    Os filtros e colunas sao guardados no plano da consulta e aplicados na
+    leitura de cada mes do armazenamento local (somente os meses do periodo
+    sao abertos). Somente o resultado final e materializado.
+
+    Examples
+    --------
+    resultado = (ConsultaInformes()
+                 .filtra(classe='Fundo de Ações', minimo_cotista=100)
+                 .periodo('2023-01-01', '2023-03-31')
+                 .colunas(['CNPJ_FUNDO', 'DT_COMPTC', 'VL_QUOTA'])
+                 .executa())
+
+    Parameters
+    ----------
+    diretorio : string
+                raiz do armazenamento local
+
+    cadastro : DataFrame
+               cadastro com a coluna CLASSE (index CNPJ_FUNDO) usado no filtro
+               por classe, se None usa carrega_cadastro
+
+    """
+
+    MOTORES = ("pandas", "arrow", "polars")
+
+    def __init__(self, diretorio=DIR_INF_DIARIO, cadastro=None):
+        self.diretorio = diretorio
+        self.cadastro = cadastro
+        self._colunas = None
+        self._cnpjs = None
+        self._classes = None
+        self._minimo_cotista = None
+        self._inicio = None
+        self._fim = None
+
+    def _copia(self, **alteracoes):
+        consulta = ConsultaInformes(self.diretorio, self.cadastro)
+        consulta.__dict__.update(self.__dict__)
+        consulta.__dict__.update(alteracoes)
+        return consulta
+
+    def filtra(self, cnpjs=None, classe=None, minimo_cotista=None):
+        """
+
+        Acrescenta filtros a consulta
+
+        Parameters
+        ----------
+        cnpjs : list
+                cnpj dos fundos desejados
+
+        classe : string ou list
+                 CLASSE do cadastro (ex.: 'Fundo Multimercado')
+
+        minimo_cotista : int
+                         fundos com minimo numero de cotista
+
+        Returns
+        -------
+        nova ConsultaInformes com os filtros
+
+        """
+
+        alteracoes = {}
+        if cnpjs is not None:
+            cnpjs = set(cnpjs)
+            alteracoes["_cnpjs"] = cnpjs if self._cnpjs is None else self._cnpjs & cnpjs
+        if classe is not None:
+            classes = {classe} if isinstance(classe, str) else set(classe)
+            alteracoes["_classes"] = classes if self._classes is None else self._classes & classes
+        if minimo_cotista is not None:
+            alteracoes["_minimo_cotista"] = max(minimo_cotista, self._minimo_cotista or 0)
+        return self._copia(**alteracoes)
+
+    def periodo(self, data_inicio=None, data_fim=None):
+        """
+
+        Restringe as datas da consulta
+
+        Parameters
+        ----------
+        data_inicio : data
+                      YYYY-MM-DD
+
+        data_fim : data
+                   YYYY-MM-DD
+
+        Returns
+        -------
+        nova ConsultaInformes com o periodo
+
+        """
+
+        return self._copia(_inicio=self._inicio if data_inicio is None else pd.Timestamp(data_inicio),
+                           _fim=self._fim if data_fim is None else pd.Timestamp(data_fim))
+
+    def colunas(self, colunas):
+        """
+
+        Seleciona as colunas do resultado
+
+        Parameters
+        ----------
+        colunas : list
+                  colunas desejadas
+
+        Returns
+        -------
+        nova ConsultaInformes com as colunas
+
+        """
+
+        return self._copia(_colunas=list(colunas))
+
+    def plano(self):
+        """
+
+        Plano da consulta: meses lidos, colunas e filtros aplicados na leitura
+
+        Returns
+        -------
+        dict com 'meses', 'colunas' e 'filtros'
+
+        """
+
+        meses = sorted(meses_armazenados(self.diretorio))
+        if self._inicio is not None:
+            meses = [mes for mes in meses if mes >= (self._inicio.year, self._inicio.month)]
+        if self._fim is not None:
+            meses = [mes for mes in meses if mes <= (self._fim.year, self._fim.month)]
+
+        # classe resolvida no cadastro como filtro de cnpj
+        cnpjs = self._cnpjs
+        if self._classes is not None:
+            cadastro = self.cadastro if self.cadastro is not None \
+                else carrega_cadastro(["CLASSE"])
+            da_classe = set(cadastro.index[cadastro["CLASSE"].isin(self._classes)])
+            cnpjs = da_classe if cnpjs is None else cnpjs & da_classe
+
+        filtros = filtros_informes(None if cnpjs is None else sorted(cnpjs),
+                                   self._inicio, self._fim, self._minimo_cotista)
+        return {"meses": meses, "colunas": self._colunas, "filtros": filtros}
+
+    def executa(self, motor="pandas"):
+        """
+
+        Executa a consulta
+
+        Parameters
+        ----------
+        motor : string
+                'pandas' (leitura mes a mes com montagem unica), 'arrow'
+                (pyarrow.dataset) ou 'polars' (opcional, precisa do polars)
+
+        Returns
+        -------
+        Pandas DataFrame, pyarrow.Table ou polars.DataFrame conforme o motor
+
+        """
+
+        if motor not in self.MOTORES:
+            raise ValueError("Motor {} não suportado, use {}".format(motor, self.MOTORES))
+
+        plano = self.plano()
+        if motor == "pandas":
+            if not plano["meses"]:
+                return pd.DataFrame(columns=plano["colunas"])
+            blocos = itera_informes(plano["meses"], self.diretorio, plano["colunas"], plano["filtros"])
+            return monta_informes(blocos)
+
+        caminhos = [caminho_mes(ano, mes, self.diretorio) for ano, mes in plano["meses"]]
+        if motor == "arrow":
+            return _executa_arrow(caminhos, plano["colunas"], plano["filtros"])
+        return _executa_polars(caminhos, plano["colunas"], plano["filtros"])
+
+
+def _esquema_unificado(caminhos):
+    """ esquema comum aos meses, promovendo colunas gravadas com tipos diferentes """
+
+    esquemas = [pq.read_schema(caminho).remove_metadata() for caminho in caminhos]
+    campos = {}
+    for esquema in esquemas:
+        for campo in esquema:
+            anterior = campos.setdefault(campo.name, campo.type)
+            if anterior == campo.type:
+                continue
+            tipos = (anterior, campo.type)
+            if any(pa.types.is_timestamp(tipo) for tipo in tipos):
+                campos[campo.name] = pa.timestamp("ns")
+            elif all(pa.types.is_integer(tipo) or pa.types.is_floating(tipo) for tipo in tipos):
+                campos[campo.name] = pa.float64()
+            else:
+                campos[campo.name] = pa.string()
+    return pa.schema(campos)
+
+
+def _executa_arrow(caminhos, colunas, filtros):
+    if not caminhos:
+        return pa.table({})
+
+    esquema = _esquema_unificado(caminhos)
+    expressao = None
+    for nome, operacao, valor in filtros or []:
+        campo = ds.field(nome)
+        if nome == "DT_COMPTC":
+            valor = pa.scalar(pd.Timestamp(valor), type=esquema.field(nome).type)
+        condicao = campo.isin(valor) if operacao == "in" else \
+            campo >= valor if operacao == ">=" else campo <= valor
+        expressao = condicao if expressao is None else expressao & condicao
+
+    dataset = ds.dataset(caminhos, schema=esquema, format="parquet")
+    return dataset.to_table(columns=colunas, filter=expressao)
+
+
+def _executa_polars(caminhos, colunas, filtros):
+    try:
+        import polars as pl
+    except ImportError as erro:
+        raise ImportError("O motor 'polars' precisa do pacote polars (pip install polars)") from erro
+
+    if not caminhos:
+        return pl.DataFrame()
+
+    # meses gravados antes do tipo fixo de NR_COTST podem ter outro esquema,
+    # o dataset do arrow le todos com o esquema unificado
+    dataset = ds.dataset(caminhos, schema=_esquema_unificado(caminhos), format="parquet")
+    consulta = pl.scan_pyarrow_dataset(dataset)
+    for nome, operacao, valor in filtros or []:
+        coluna = pl.col(nome)
+        if nome == "CNPJ_FUNDO":
+            coluna = coluna.cast(pl.Utf8)
+        if nome == "DT_COMPTC":
+            valor = pd.Timestamp(valor).to_pydatetime()
+        condicao = coluna.is_in(list(valor)) if operacao == "in" else \
+            coluna >= valor if operacao == ">=" else coluna <= valor
+        consulta = consulta.filter(condicao)
+    if colunas is not None:
+        consulta = consulta.select(colunas)
+    return consulta.collect()
+
+
+# %% importacao do historico pela linha de comando
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dados dos fundos da CVM")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    historico = comandos.add_parser(
+        "historico", help="importa os informes diarios dos anos (mensais e HIST) "
+                          "e grava o dataset unificado")
+    historico.add_argument("ano_inicio", type=int)
+    historico.add_argument("ano_fim", type=int)
+    historico.add_argument("--processos", type=int, default=PROCESSOS)
+    historico.add_argument("--conexoes", type=int, default=MAX_CONEXOES)
+
+    argumentos = parser.parse_args()
+
+    datas = pd.date_range("{}-01-01".format(argumentos.ano_inicio),
+                          "{}-12-01".format(argumentos.ano_fim), freq="MS")
+    datas = datas[datas <= pd.Timestamp.today()]
+    baixados, falhas = atualiza_informes(datas, max_conexoes=argumentos.conexoes,
+                                         processos=argumentos.processos)
+    print("{} meses importados, {} falhas".format(len(baixados), len(falhas)))
+
+    dataset = DatasetInformes().adiciona_cvm(datas[0], datas[-1], atualiza_abertos=False)
+    print("Dataset {} gravado ({} linhas)".format(dataset.grava(), len(dataset.informes)))
@@ -0,0 +1,857 @@
+"""
+
+Indices sobre os informes diarios da CVM
+
+Os informes sao ordenados por (CNPJ, data) com o CNPJ convertido para uma
+chave inteira (os 14 digitos do CNPJ). Um vetor de offsets no estilo CSR
+guarda onde comeca e termina cada fundo, assim o historico de um fundo e uma
+fatia (sem copia) encontrada por busca binaria:
+
+    linhas do fundo i = offsets[i]:offsets[i + 1]
+
+Os atributos do cadastro (classe, tipo, situacao, faixa de PL, administrador
+e gestor) sao indexados em bitmaps, um por valor, com um bit por fundo. Um
+filtro com varios atributos e resolvido com operacoes bit a bit:
+
+    indice.filtra(CLASSE='Fundo de Ações', PL=['1 bi a 10 bi', 'acima de 10 bi'])
+
+Os nomes dos fundos, administradores e gestores sao normalizados (sem acento,
+maiusculas) e indexados por palavra, com busca por prefixo, por palavras e
+aproximada (trigramas e um erro de digitacao nas palavras curtas):
+
+    indice_nomes.prefixo('itau')  ->  fundos com nome iniciado por 'ITAÚ'
+
+A matriz de quotas (datas x fundos) e gravada em arquivos .npy lidos como
+memmap, assim varios processos compartilham a mesma copia em memoria:
+
+    dados/matriz/quotas.npy, pl.npy, cotistas.npy, datas.npy, chaves.npy
+
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+DIR_MATRIZ = os.path.join("dados", "matriz")
+
+# matrizes construidas a partir dos informes: coluna e tipo
+MATRIZES = {"quotas": ("VL_QUOTA", np.float64),
+            "pl": ("VL_PATRIM_LIQ", np.float32),
+            "cotistas": ("NR_COTST", np.float32)}
+
+# atributos do cadastro indexados e faixas de patrimonio liquido
+ATRIBUTOS = ["CLASSE", "TP_FUNDO", "SIT", "ADMIN", "GESTOR"]
+# colunas do cadastro indexadas na busca por nome
+CAMPOS_NOMES = ["DENOM_SOCIAL", "ADMIN", "GESTOR"]
+
+# palavras ate esse tamanho na busca aproximada aceitam um erro de digitacao
+PALAVRA_CURTA = 5
+
+FAIXAS_PL = {"ate 10 mi": 1e7, "10 mi a 100 mi": 1e8, "100 mi a 1 bi": 1e9,
+             "1 bi a 10 bi": 1e10, "acima de 10 bi": np.inf}
+
+# funcoes de conversao do cnpj
+
+
+def cnpj_para_chave(cnpj):
+    """
+
+    Chave inteira de um CNPJ
+
+    Parameters
+    ----------
+    cnpj : string
+           '05.523.348/0001-87'
+
+    Returns
+    -------
+    int 5523348000187
+
+    """
+
+    return int("".join(caractere for caractere in cnpj if caractere.isdigit()))
+
+
+def chave_para_cnpj(chave):
+    """
+
+    CNPJ formatado de uma chave inteira
+
+    Parameters
+    ----------
+    chave : int
+            5523348000187
+
+    Returns
+    -------
+    string '05.523.348/0001-87'
+
+    """
+
+    digitos = "{:014d}".format(int(chave))
+    return "{}.{}.{}/{}-{}".format(digitos[:2], digitos[2:5], digitos[5:8],
+                                   digitos[8:12], digitos[12:])
+
+
+def chaves_cnpj(serie):
+    """
+
+    Chaves inteiras de uma coluna de CNPJ, convertidas uma vez por CNPJ distinto
+
+    Parameters
+    ----------
+    serie : Series
+            coluna CNPJ_FUNDO (texto ou categoria)
+
+    Returns
+    -------
+    numpy array int64 com as chaves
+
+    """
+
+    categorias = serie if isinstance(serie.dtype, pd.CategoricalDtype) \
+        else serie.astype("category")
+    chaves = np.array([cnpj_para_chave(cnpj) for cnpj in categorias.cat.categories] + [-1],
+                      dtype=np.int64)
+    return chaves[categorias.cat.codes.to_numpy()]
+
+
+# indice por fundo
+
+class IndiceFundos:
+    """
+
+    Informes ordenados por (CNPJ, data) com offsets por fundo
+
+    Parameters
+    ----------
+    informes : DataFrame
+               informes diarios com as colunas CNPJ_FUNDO e DT_COMPTC
+
+    Attributes
+    ----------
+    informes : DataFrame
+               informes ordenados, com a coluna CHAVE_CNPJ (int64)
+
+    chaves : numpy array
+             chaves dos fundos em ordem crescente
+
+    offsets : numpy array
+              inicio das linhas de cada fundo, com o total de linhas no final
+
+    """
+
+    def __init__(self, informes):
+        chaves = chaves_cnpj(informes["CNPJ_FUNDO"])
+        ordem = np.lexsort((informes["DT_COMPTC"].to_numpy(), chaves))
+
+        self.informes = informes.take(ordem).reset_index(drop=True)
+        self.informes["CHAVE_CNPJ"] = chaves[ordem]
+
+        self.chaves, inicios = np.unique(self.informes["CHAVE_CNPJ"].to_numpy(),
+                                         return_index=True)
+        self.offsets = np.append(inicios, len(self.informes))
+        self._colunas = {}
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def __contains__(self, cnpj):
+        return self.posicao(cnpj) is not None
+
+    def posicao(self, cnpj):
+        """
+
+        Posicao do fundo no indice por busca binaria
+
+        Parameters
+        ----------
+        cnpj : string ou int
+               CNPJ formatado ou chave inteira
+
+        Returns
+        -------
+        int com a posicao do fundo ou None se o fundo nao esta nos informes
+
+        """
+
+        chave = cnpj_para_chave(cnpj) if isinstance(cnpj, str) else cnpj
+        posicao = np.searchsorted(self.chaves, chave)
+        if posicao < len(self.chaves) and self.chaves[posicao] == chave:
+            return int(posicao)
+        return None
+
+    def fatia(self, cnpj):
+        """
+
+        Linhas do fundo nos informes ordenados
+
+        Parameters
+        ----------
+        cnpj : string ou int
+               CNPJ formatado ou chave inteira
+
+        Returns
+        -------
+        slice com as linhas do fundo (vazio se o fundo nao esta nos informes)
+
+        """
+
+        posicao = self.posicao(cnpj)
+        if posicao is None:
+            return slice(0, 0)
+        return slice(self.offsets[posicao], self.offsets[posicao + 1])
+
+    def fundo(self, cnpj, colunas=None):
+        """
+
+        Historico de um fundo
+
+        Parameters
+        ----------
+        cnpj : string ou int
+               CNPJ formatado ou chave inteira
+
+        colunas : list
+                  colunas desejadas, se None todas as colunas
+
+        Returns
+        -------
+        Pandas DataFrame com as linhas do fundo ordenadas por data
+
+        """
+
+        fundo = self.informes.iloc[self.fatia(cnpj)]
+        return fundo if colunas is None else fundo[colunas]
+
+    def valores(self, cnpj, coluna="VL_QUOTA"):
+        """
+
+        Valores de uma coluna de um fundo, sem copia
+
+        Parameters
+        ----------
+        cnpj : string ou int
+               CNPJ formatado ou chave inteira
+
+        coluna : string
+                 coluna desejada
+
+        Returns
+        -------
+        numpy array (visao sobre a coluna dos informes ordenados)
+
+        """
+
+        if coluna not in self._colunas:
+            self._colunas[coluna] = self.informes[coluna].to_numpy()
+        return self._colunas[coluna][self.fatia(cnpj)]
+
+    def linhas(self, cnpjs):
+        """
+
+        Linhas de varios fundos nos informes ordenados
+
+        Parameters
+        ----------
+        cnpjs : list
+                CNPJ formatados ou chaves inteiras
+
+        Returns
+        -------
+        numpy array com as linhas dos fundos encontrados, na ordem solicitada
+
+        """
+
+        fatias = [self.fatia(cnpj) for cnpj in cnpjs]
+        if not fatias:
+            return np.array([], dtype=np.int64)
+        return np.concatenate([np.arange(fatia.start, fatia.stop) for fatia in fatias])
+
+
+# indice dos atributos do cadastro
+
+class IndiceAtributos:
+    """
+
+    Bitmaps dos atributos do cadastro, um por valor, com um bit por fundo
+
+    Parameters
+    ----------
+    cadastro : DataFrame
+               cadastro dos fundos com CNPJ_FUNDO no index
+
+    atributos : list
+                colunas do cadastro indexadas (as ausentes sao ignoradas)
+
+    Attributes
+    ----------
+    chaves : numpy array
+             chaves dos fundos em ordem crescente (posicao dos bits)
+
+    bitmaps : dict
+              {atributo: {valor: numpy array uint8 com os bits empacotados}},
+              com o atributo 'PL' pelas FAIXAS_PL quando o cadastro tem
+              VL_PATRIM_LIQ
+
+    versao : string
+             hash dos fundos e dos bitmaps, muda quando o cadastro indexado muda
+
+    """
+
+    def __init__(self, cadastro, atributos=ATRIBUTOS):
+        chaves = chaves_cnpj(cadastro.index.to_series())
+        ordem = np.argsort(chaves, kind="stable")
+        self.chaves = chaves[ordem]
+
+        colunas = {atributo: cadastro[atributo].iloc[ordem]
+                   for atributo in atributos if atributo in cadastro}
+        if "VL_PATRIM_LIQ" in cadastro:
+            colunas["PL"] = pd.cut(pd.to_numeric(cadastro["VL_PATRIM_LIQ"].iloc[ordem],
+                                                 errors="coerce"),
+                                   [-np.inf, *FAIXAS_PL.values()], labels=list(FAIXAS_PL))
+
+        self.bitmaps = {}
+        for atributo, coluna in colunas.items():
+            categorias = coluna.astype("category")
+            codigos = categorias.cat.codes.to_numpy()
+            self.bitmaps[atributo] = {
+                valor: np.packbits(codigos == codigo)
+                for codigo, valor in enumerate(categorias.cat.categories)}
+
+        resumo = hashlib.sha256(np.ascontiguousarray(self.chaves).view(np.uint8))
+        for atributo in sorted(self.bitmaps):
+            for valor, bits in self.bitmaps[atributo].items():
+                resumo.update(repr((atributo, valor)).encode())
+                resumo.update(bits)
+        self.versao = resumo.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def valores(self, atributo):
+        """ valores indexados de um atributo """
+
+        return list(self.bitmaps[atributo])
+
+    def bitmap(self, **filtros):
+        """
+
+        Bitmap dos fundos que atendem aos filtros: valores de um mesmo atributo
+        sao combinados com ou, atributos diferentes com e
+
+        Parameters
+        ----------
+        filtros : atributo=valor ou atributo=[valores]
+
+        Returns
+        -------
+        numpy array uint8 com os bits empacotados
+
+        """
+
+        resultado = np.packbits(np.ones(len(self.chaves), dtype=bool))
+        for atributo, valores in filtros.items():
+            if atributo not in self.bitmaps:
+                raise KeyError("Atributo {} não indexado".format(atributo))
+            valores = [valores] if isinstance(valores, str) else valores
+            atende = np.zeros_like(resultado)
+            for valor in valores:
+                if valor in self.bitmaps[atributo]:
+                    atende |= self.bitmaps[atributo][valor]
+            resultado &= atende
+        return resultado
+
+    def chaves_filtro(self, **filtros):
+        """
+
+        Chaves dos fundos que atendem aos filtros, ver bitmap
+
+        Returns
+        -------
+        numpy array int64 com as chaves em ordem crescente
+
+        """
+
+        bits = np.unpackbits(self.bitmap(**filtros), count=len(self.chaves)).astype(bool)
+        return self.chaves[bits]
+
+    def filtra(self, **filtros):
+        """
+
+        CNPJ dos fundos que atendem aos filtros, ver bitmap
+
+        Returns
+        -------
+        list com os CNPJ formatados
+
+        """
+
+        return [chave_para_cnpj(chave) for chave in self.chaves_filtro(**filtros)]
+
+
+# indice dos nomes
+
+def normaliza_nome(texto):
+    """
+
+    Nome sem acentos, em maiusculas e somente com letras, numeros e espacos
+
+    Parameters
+    ----------
+    texto : string
+            'Itaú Ações FIC'
+
+    Returns
+    -------
+    string 'ITAU ACOES FIC'
+
+    """
+
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(caractere for caractere in texto if not unicodedata.combining(caractere))
+    return " ".join(re.sub(r"[^0-9A-Z]+", " ", texto.upper()).split())
+
+
+def _trigramas(palavra):
+    """ trigramas com dois espacos no inicio e um no fim, como no pg_trgm """
+
+    palavra = "  {} ".format(palavra)
+    return {palavra[posicao:posicao + 3] for posicao in range(len(palavra) - 2)}
+
+
+def _um_erro(palavra, outra):
+    """ True se as palavras diferem por no maximo uma troca, insercao ou remocao """
+
+    if len(palavra) > len(outra):
+        palavra, outra = outra, palavra
+    if len(outra) - len(palavra) > 1:
+        return False
+    for posicao, (letra, outra_letra) in enumerate(zip(palavra, outra)):
+        if letra != outra_letra:
+            if len(palavra) == len(outra):
+                return palavra[posicao + 1:] == outra[posicao + 1:]
+            return palavra[posicao:] == outra[posicao + 1:]
+    return True
+
+
+class IndiceNomes:
+    """
+
+    Busca por nome dos fundos, administradores e gestores sem diferenca de
+    acentos e maiusculas
+
+    Parameters
+    ----------
+    cadastro : DataFrame
+               cadastro dos fundos com CNPJ_FUNDO no index
+
+    campos : list
+             colunas de nomes indexadas (as ausentes sao ignoradas)
+
+    Attributes
+    ----------
+    cnpjs : numpy array
+            CNPJ dos fundos na ordem do cadastro (posicao dos fundos)
+
+    nomes : dict
+            {campo: (nomes normalizados em ordem, posicoes dos fundos)} para a
+            busca por prefixo
+
+    palavras : list
+               vocabulario em ordem, com as posicoes dos fundos em postagens
+
+    """
+
+    def __init__(self, cadastro, campos=CAMPOS_NOMES):
+        self.cnpjs = cadastro.index.to_numpy()
+        self.campos = [campo for campo in campos if campo in cadastro]
+
+        # nomes normalizados de cada campo em ordem alfabetica
+        self.nomes = {}
+        postagens = {}
+        for campo in self.campos:
+            valores = cadastro[campo].astype("category")
+            normalizados = np.array([normaliza_nome(valor) for valor in valores.cat.categories]
+                                    + [""], dtype=object)
+            nomes = normalizados[valores.cat.codes.to_numpy()]
+            ordem = np.argsort(nomes, kind="stable")
+            self.nomes[campo] = (list(nomes[ordem]), ordem)
+
+            for posicao, nome in enumerate(nomes):
+                for palavra in set(nome.split()):
+                    postagens.setdefault(palavra, set()).add(posicao)
+
+        self.palavras = sorted(postagens)
+        self.postagens = [np.array(sorted(postagens[palavra]), dtype=np.int64)
+                          for palavra in self.palavras]
+
+        # trigramas do vocabulario para a busca aproximada
+        trigramas = {}
+        for numero, palavra in enumerate(self.palavras):
+            for trigrama in _trigramas(palavra):
+                trigramas.setdefault(trigrama, []).append(numero)
+        self.trigramas = {trigrama: np.array(numeros, dtype=np.int64)
+                          for trigrama, numeros in trigramas.items()}
+        self._tamanhos = np.array([len(_trigramas(palavra)) for palavra in self.palavras])
+        self._comprimentos = np.array([len(palavra) for palavra in self.palavras])
+
+    def __len__(self):
+        return len(self.cnpjs)
+
+    def prefixo(self, texto, campo="DENOM_SOCIAL"):
+        """
+
+        Fundos com o nome iniciado pelo texto (como str.startswith)
+
+        Parameters
+        ----------
+        texto : string
+                inicio do nome, ex.: 'itau'
+
+        campo : string
+                coluna de nomes ('DENOM_SOCIAL', 'ADMIN' ou 'GESTOR')
+
+        Returns
+        -------
+        list com os CNPJ dos fundos em ordem alfabetica do nome
+
+        """
+
+        nomes, ordem = self.nomes[campo]
+        texto = normaliza_nome(texto)
+        inicio = bisect.bisect_left(nomes, texto)
+        fim = bisect.bisect_left(nomes, texto + "\uffff", lo=inicio)
+        return list(self.cnpjs[ordem[inicio:fim]])
+
+    def _palavras_prefixo(self, prefixo):
+        inicio = bisect.bisect_left(self.palavras, prefixo)
+        fim = bisect.bisect_left(self.palavras, prefixo + "\uffff", lo=inicio)
+        return range(inicio, fim)
+
+    def busca(self, texto):
+        """
+
+        Fundos com todas as palavras do texto em algum dos campos, a ultima
+        palavra pode ser incompleta
+
+        Parameters
+        ----------
+        texto : string
+                palavras procuradas, ex.: 'itau acoes div'
+
+        Returns
+        -------
+        list com os CNPJ dos fundos na ordem do cadastro
+
+        """
+
+        palavras = normaliza_nome(texto).split()
+        if not palavras:
+            return []
+
+        posicoes = None
+        for numero, palavra in enumerate(palavras):
+            if numero == len(palavras) - 1:
+                encontradas = self._palavras_prefixo(palavra)
+            else:
+                posicao = bisect.bisect_left(self.palavras, palavra)
+                encontradas = [posicao] if posicao < len(self.palavras) \
+                    and self.palavras[posicao] == palavra else []
+            if not encontradas:
+                return []
+            fundos = np.unique(np.concatenate([self.postagens[numero_palavra]
+                                               for numero_palavra in encontradas]))
+            posicoes = fundos if posicoes is None else np.intersect1d(posicoes, fundos)
+        return list(self.cnpjs[posicoes])
+
+    def aproximada(self, texto, semelhanca=0.4, num=20, palavra_curta=PALAVRA_CURTA):
+        """
+
+        Fundos com palavras parecidas com as do texto (erros de digitacao),
+        pela semelhanca dos trigramas das palavras. Nas palavras curtas um
+        erro muda boa parte dos trigramas, entao as palavras do vocabulario a
+        um erro de digitacao tambem sao aceitas, com a semelhanca minima
+
+        Parameters
+        ----------
+        texto : string
+                palavras procuradas, ex.: 'itao acoens' encontra 'ITAÚ AÇÕES'
+
+        semelhanca : float
+                     semelhanca minima (0 a 1) de cada palavra
+
+        num : int
+              quantidade maxima de fundos
+
+        palavra_curta : int
+                        tamanho maximo das palavras aceitas por um erro de
+                        digitacao
+
+        Returns
+        -------
+        Pandas Series com a pontuacao de cada CNPJ, em ordem decrescente
+
+        """
+
+        pontos = np.zeros(len(self.cnpjs))
+        for palavra in normaliza_nome(texto).split():
+            trigramas = _trigramas(palavra)
+            numeros = [self.trigramas[trigrama] for trigrama in trigramas
+                       if trigrama in self.trigramas]
+            if not numeros:
+                continue
+            comuns = np.bincount(np.concatenate(numeros), minlength=len(self.palavras))
+            candidatas = np.flatnonzero(comuns)
+            indices = comuns[candidatas] / (len(trigramas) + self._tamanhos[candidatas]
+                                            - comuns[candidatas])
+            if len(palavra) <= palavra_curta:
+                proximas = np.abs(self._comprimentos[candidatas] - len(palavra)) <= 1
+                for posicao in np.flatnonzero(proximas & (indices < semelhanca)):
+                    if _um_erro(palavra, self.palavras[candidatas[posicao]]):
+                        indices[posicao] = semelhanca
+
+            # melhor semelhanca da palavra em cada fundo
+            melhor = np.zeros(len(self.cnpjs))
+            for candidata, indice in zip(candidatas[indices >= semelhanca],
+                                         indices[indices >= semelhanca]):
+                fundos = self.postagens[candidata]
+                melhor[fundos] = np.maximum(melhor[fundos], indice)
+            pontos += melhor
+
+        encontrados = np.flatnonzero(pontos)
+        encontrados = encontrados[np.argsort(-pontos[encontrados], kind="stable")][:num]
+        return pd.Series(pontos[encontrados], index=self.cnpjs[encontrados], name="Pontos")
+
+
+# matriz datas x fundos
+
+def _grava_npy(caminho, vetor):
+    """ grava o .npy em um temporario e troca pelo arquivo final """
+
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        np.save(arquivo, vetor)
+    os.replace(temporario, caminho)
+
+
+class MatrizQuotas:
+    """
+
+    Quotas, patrimonio liquido e cotistas em matrizes densas datas x fundos
+
+    Parameters
+    ----------
+    datas : numpy array
+            datas (datetime64) das linhas
+
+    chaves : numpy array
+             chaves dos fundos (int64, ver cnpj_para_chave) das colunas
+
+    matrizes : dict
+               {'quotas': array, 'pl': array, 'cotistas': array}, NaN quando o
+               fundo nao tem informe na data
+
+    versao : string
+             versao dos informes usados na construcao
+
+    """
+
+    def __init__(self, datas, chaves, matrizes, versao=None):
+        self.datas = datas
+        self.chaves = chaves
+        self.matrizes = matrizes
+        self.versao = versao
+
+    @classmethod
+    def constroi(cls, informes, versao=None):
+        """
+
+        Constroi as matrizes a partir dos informes, sem pivot
+
+        Parameters
+        ----------
+        informes : DataFrame
+                   informes diarios com CNPJ_FUNDO, DT_COMPTC e VL_QUOTA
+
+        versao : string
+                 versao dos informes (ex.: DatasetInformes.versao), se None
+                 usa o hash das datas, fundos, quotas e cotistas
+
+        Returns
+        -------
+        MatrizQuotas em memoria
+
+        """
+
+        chaves_linhas = chaves_cnpj(informes["CNPJ_FUNDO"])
+        datas_linhas = informes["DT_COMPTC"].to_numpy()
+
+        chaves, colunas = np.unique(chaves_linhas, return_inverse=True)
+        datas, linhas = np.unique(datas_linhas, return_inverse=True)
+
+        matrizes = {}
+        for nome, (coluna, tipo) in MATRIZES.items():
+            if coluna not in informes:
+                continue
+            matriz = np.full((len(datas), len(chaves)), np.nan, dtype=tipo)
+            matriz[linhas, colunas] = informes[coluna].to_numpy(dtype=tipo)
+            matrizes[nome] = matriz
+
+        if versao is None:
+            resumo = hashlib.sha256()
+            for vetor in (datas, chaves, matrizes.get("quotas", np.empty(0)),
+                          matrizes.get("cotistas", np.empty(0))):
+                resumo.update(np.ascontiguousarray(vetor).view(np.uint8))
+            versao = resumo.hexdigest()[:16]
+
+        return cls(datas, chaves, matrizes, versao)
+
+    def grava(self, diretorio=DIR_MATRIZ):
+        """
+
+        Grava as matrizes em arquivos .npy
+
+        Parameters
+        ----------
+        diretorio : string
+                    pasta das matrizes
+
+        Returns
+        -------
+        string com a pasta gravada
+
+        """
+
+        # cada arquivo e gravado em um temporario e trocado (novo inode), assim
+        # as instancias abertas por carrega() continuam lendo os arquivos antigos
+        os.makedirs(diretorio, exist_ok=True)
+        _grava_npy(os.path.join(diretorio, "datas.npy"), self.datas)
+        _grava_npy(os.path.join(diretorio, "chaves.npy"), self.chaves)
+        for nome, matriz in self.matrizes.items():
+            _grava_npy(os.path.join(diretorio, nome + ".npy"), matriz)
+
+        # matriz.json por ultimo: so aponta para a nova versao com tudo gravado
+        caminho = os.path.join(diretorio, "matriz.json")
+        with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+            json.dump({"versao": self.versao, "matrizes": list(self.matrizes)}, arquivo)
+        os.replace(caminho + ".tmp", caminho)
+
+        return diretorio
+
+    @classmethod
+    def carrega(cls, diretorio=DIR_MATRIZ, mmap_mode="r"):
+        """
+
+        Le as matrizes gravadas como memmap (sem copia para a memoria)
+
+        Parameters
+        ----------
+        diretorio : string
+                    pasta das matrizes
+
+        mmap_mode : string
+                    modo do np.load ('r' somente leitura, None le tudo)
+
+        Returns
+        -------
+        MatrizQuotas com as matrizes mapeadas
+
+        """
+
+        with open(os.path.join(diretorio, "matriz.json"), encoding="utf-8") as arquivo:
+            meta = json.load(arquivo)
+
+        matrizes = {nome: np.load(os.path.join(diretorio, nome + ".npy"), mmap_mode=mmap_mode)
+                    for nome in meta["matrizes"]}
+        return cls(np.load(os.path.join(diretorio, "datas.npy")),
+                   np.load(os.path.join(diretorio, "chaves.npy")),
+                   matrizes, meta["versao"])
+
+    @property
+    def cnpjs(self):
+        return [chave_para_cnpj(chave) for chave in self.chaves]
+
+    def posicoes(self, cnpjs):
+        """
+
+        Colunas dos fundos na matriz
+
+        Parameters
+        ----------
+        cnpjs : list
+                CNPJ formatados ou chaves inteiras
+
+        Returns
+        -------
+        numpy array com as colunas dos fundos encontrados, na ordem solicitada
+
+        """
+
+        chaves = np.array([cnpj_para_chave(cnpj) if isinstance(cnpj, str) else cnpj
+                           for cnpj in cnpjs], dtype=np.int64)
+        if not len(self.chaves):
+            return np.array([], dtype=np.int64)
+        posicoes = np.searchsorted(self.chaves, chaves)
+        posicoes = np.minimum(posicoes, len(self.chaves) - 1)
+        return posicoes[self.chaves[posicoes] == chaves]
+
+    def serie(self, cnpj, nome="quotas"):
+        """
+
+        Serie de um fundo, sem copia
+
+        Parameters
+        ----------
+        cnpj : string ou int
+               CNPJ formatado ou chave inteira
+
+        nome : string
+               'quotas', 'pl' ou 'cotistas'
+
+        Returns
+        -------
+        Pandas Series com as datas no index
+
+        """
+
+        posicao = self.posicoes([cnpj])
+        if not len(posicao):
+            return pd.Series(dtype=float)
+        return pd.Series(self.matrizes[nome][:, posicao[0]],
+                         index=pd.DatetimeIndex(self.datas), name=cnpj, copy=False)
+
+    def quadro(self, nome="quotas", colunas=None):
+        """
+
+        Matriz como DataFrame com datas no index e CNPJ nas colunas
+
+        Parameters
+        ----------
+        nome : string
+               'quotas', 'pl' ou 'cotistas'
+
+        colunas : numpy array
+                  colunas desejadas (ver posicoes), se None todos os fundos
+                  (sem copia)
+
+        Returns
+        -------
+        Pandas DataFrame datas x fundos
+
+        """
+
+        matriz = self.matrizes[nome]
+        chaves = self.chaves
+        if colunas is not None:
+            matriz = matriz[:, colunas]
+            chaves = chaves[colunas]
+
+        return pd.DataFrame(matriz, index=pd.DatetimeIndex(self.datas),
+                            columns=[chave_para_cnpj(chave) for chave in chaves], copy=False)
@@ -0,0 +1,295 @@
+"""
+
+Retorno e volatilidade em janelas moveis para todos os fundos
+
+As janelas sao contadas nos informes de cada fundo (observacoes), nao nas
+linhas da matriz: os retornos de cada fundo sao tomados entre quotas validas
+consecutivas e empilhados em ordem, assim datas informadas por outros fundos
+e dias sem informe do proprio fundo nao entram nas janelas.
+
+As estatisticas de qualquer janela sao diferencas de somas acumuladas
+(prefixos) do log dos retornos e do seu quadrado, assim o custo total e
+proporcional a observacoes x fundos, qualquer que seja o tamanho da janela:
+
+    soma(k, w)         = prefixo[k] - prefixo[k - w]
+    retorno(k, w)      = exp(soma(k, w)) - 1
+    volatilidade(k, w) = raiz((soma_quadrados - soma**2 / w) / (w - 1) * 252)
+
+O resultado e um array 3-D (metrica x data x fundo) em float32, com cada
+janela na data da sua ultima observacao.
+
+O log da quota acumulado de cada fundo tambem responde o retorno de qualquer
+periodo com duas consultas e uma subtracao, sem percorrer os dados:
+
+    retorno(inicio, fim) = exp(log_quota[fim] - log_quota[inicio]) - 1
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from fin_indices import chave_para_cnpj, cnpj_para_chave
+from fin_ranking import DIAS_UTEIS, preenche_quotas
+
+# janelas em dias uteis: mes, trimestre e ano
+JANELAS = (21, 63, 252)
+
+
+# funcoes de prefixos
+
+def _prefixo(valores):
+    """ somas acumuladas com zero na frente, prefixo[t] = soma das linhas < t """
+
+    prefixo = np.zeros((len(valores) + 1, valores.shape[1]), dtype=np.float64)
+    np.cumsum(valores, axis=0, out=prefixo[1:])
+    return prefixo
+
+
+class JanelasMoveis:
+    """
+
+    Retorno e volatilidade anualizada de todos os fundos em janelas moveis
+
+    Parameters
+    ----------
+    valores : numpy array
+              metrica x data x fundo, NaN nas datas sem informe do fundo e
+              quando a janela nao esta completa
+
+    metricas : list
+               nomes das metricas na primeira dimensao ('retorno_21',
+               'volatilidade_21', ...)
+
+    datas : numpy array
+            datas (datetime64) da segunda dimensao
+
+    chaves : numpy array
+             chaves dos fundos (int64) da terceira dimensao
+
+    """
+
+    def __init__(self, valores, metricas, datas, chaves):
+        self.valores = valores
+        self.metricas = list(metricas)
+        self.datas = datas
+        self.chaves = chaves
+
+    @classmethod
+    def calcula(cls, matriz, janelas=JANELAS, colunas=None, dias_ano=DIAS_UTEIS,
+                tipo=np.float32):
+        """
+
+        Calcula as janelas moveis a partir da matriz de quotas
+
+        Parameters
+        ----------
+        matriz : MatrizQuotas
+                 matriz com 'quotas'
+
+        janelas : tuple
+                  tamanhos das janelas em retornos diarios de cada fundo
+
+        colunas : numpy array
+                  colunas dos fundos desejados (ver MatrizQuotas.posicoes), se
+                  None todos os fundos
+
+        dias_ano : int
+                   dias uteis no ano para anualizar a volatilidade
+
+        tipo : numpy dtype
+               tipo do array de resultado
+
+        Returns
+        -------
+        JanelasMoveis
+
+        """
+
+        colunas = slice(None) if colunas is None else colunas
+        quotas = np.array(matriz.matrizes["quotas"][:, colunas], dtype=np.float64)
+        quotas[~(quotas > 0)] = np.nan
+        log_quotas = np.log(quotas)
+
+        # log do retorno de cada quota valida contra a quota valida anterior
+        # do proprio fundo, na linha (data) da quota
+        retornos = log_quotas - np.vstack([np.full((1, log_quotas.shape[1]), np.nan),
+                                           np.log(preenche_quotas(quotas))[:-1]])
+        linhas, fundos = np.nonzero(~np.isnan(retornos))
+        observacao = (np.cumsum(~np.isnan(retornos), axis=0) - 1)[linhas, fundos]
+
+        # retornos empilhados por fundo: observacao x fundo, prefixos da soma
+        # e do quadrado (as posicoes apos a ultima observacao ficam com zero)
+        num_observacoes = observacao.max() + 1 if len(observacao) else 0
+        empilhados = np.zeros((num_observacoes, log_quotas.shape[1]))
+        empilhados[observacao, fundos] = retornos[linhas, fundos]
+        soma = _prefixo(empilhados)
+        soma_quadrados = _prefixo(empilhados ** 2)
+
+        metricas = [nome.format(janela) for janela in janelas
+                    for nome in ("retorno_{}", "volatilidade_{}")]
+        valores = np.full((2 * len(janelas), len(log_quotas), log_quotas.shape[1]), np.nan,
+                          dtype=tipo)
+        for posicao, janela in enumerate(janelas):
+            # janelas completas: observacoes k = janela - 1..fim, (k - janela, k]
+            completas = observacao >= janela - 1
+            fim = observacao[completas] + 1
+            fundos_janela = fundos[completas]
+            soma_janela = soma[fim, fundos_janela] - soma[fim - janela, fundos_janela]
+            variancia = ((soma_quadrados[fim, fundos_janela]
+                          - soma_quadrados[fim - janela, fundos_janela])
+                         - soma_janela ** 2 / janela) / (janela - 1)
+
+            linhas_janela = linhas[completas]
+            valores[2 * posicao, linhas_janela, fundos_janela] = np.expm1(soma_janela)
+            valores[2 * posicao + 1, linhas_janela, fundos_janela] = \
+                np.sqrt(np.maximum(variancia, 0) * dias_ano)
+
+        return cls(valores, metricas, matriz.datas, matriz.chaves[colunas])
+
+    def quadro(self, metrica, cnpjs=None):
+        """
+
+        Uma metrica como DataFrame datas x fundos, no formato dos graficos
+        (ex.: plot_retorno_diario)
+
+        Parameters
+        ----------
+        metrica : string
+                  'retorno_21', 'volatilidade_63', ...
+
+        cnpjs : list
+                CNPJ formatados ou chaves inteiras, se None todos os fundos
+
+        Returns
+        -------
+        Pandas DataFrame com datas no index e CNPJ nas colunas
+
+        """
+
+        valores = self.valores[self.metricas.index(metrica)]
+        chaves = self.chaves
+        if cnpjs is not None:
+            procuradas = np.array([cnpj_para_chave(cnpj) if isinstance(cnpj, str) else cnpj
+                                   for cnpj in cnpjs], dtype=np.int64)
+            ordem = np.argsort(chaves)
+            posicoes = ordem[np.searchsorted(chaves, procuradas, sorter=ordem)
+                             .clip(0, len(chaves) - 1)]
+            posicoes = posicoes[chaves[posicoes] == procuradas]
+            valores, chaves = valores[:, posicoes], chaves[posicoes]
+
+        return pd.DataFrame(valores, index=pd.DatetimeIndex(self.datas),
+                            columns=[chave_para_cnpj(chave) for chave in chaves])
+
+
+# consultas de retorno por periodo
+
+class LogQuotas:
+    """
+
+    Log da quota de cada fundo por data (repetido nos dias sem informe), para
+    o retorno de todos os fundos em qualquer periodo
+
+    Parameters
+    ----------
+    log_quotas : numpy array
+                 datas x fundos, NaN fora da vida do fundo
+
+    datas : numpy array
+            datas (datetime64) das linhas
+
+    chaves : numpy array
+             chaves dos fundos (int64) das colunas
+
+    """
+
+    def __init__(self, log_quotas, datas, chaves):
+        self.log_quotas = log_quotas
+        self.datas = datas
+        self.chaves = chaves
+        self.cnpjs = pd.Index([chave_para_cnpj(chave) for chave in chaves], name="CNPJ_FUNDO")
+
+    @classmethod
+    def constroi(cls, matriz, colunas=None):
+        """
+
+        Constroi o log das quotas a partir da matriz de quotas
+
+        Parameters
+        ----------
+        matriz : MatrizQuotas
+                 matriz com 'quotas'
+
+        colunas : numpy array
+                  colunas dos fundos desejados (ver MatrizQuotas.posicoes), se
+                  None todos os fundos
+
+        Returns
+        -------
+        LogQuotas
+
+        """
+
+        colunas = slice(None) if colunas is None else colunas
+        quotas = np.array(matriz.matrizes["quotas"][:, colunas], dtype=np.float64)
+        quotas[~(quotas > 0)] = np.nan
+        return cls(np.log(preenche_quotas(quotas)), matriz.datas, matriz.chaves[colunas])
+
+    def _linha(self, data):
+        """ ultima linha com data ate a data informada (-1 antes da primeira) """
+
+        return np.searchsorted(self.datas, np.datetime64(pd.Timestamp(data)), side="right") - 1
+
+    def retorno(self, data_inicio, data_fim):
+        """
+
+        Retorno de todos os fundos entre a quota de data_inicio e a de
+        data_fim (ultima quota ate cada data)
+
+        Parameters
+        ----------
+        data_inicio : data
+                      YYYY-MM-DD
+
+        data_fim : data
+                   YYYY-MM-DD
+
+        Returns
+        -------
+        Pandas Series com o retorno de cada CNPJ, NaN se o fundo nao tem quota
+        nas duas datas
+
+        """
+
+        inicio, fim = self._linha(data_inicio), self._linha(data_fim)
+        if inicio < 0 or fim < 0:
+            return pd.Series(np.nan, index=self.cnpjs, name="Retorno")
+        return pd.Series(np.expm1(self.log_quotas[fim] - self.log_quotas[inicio]),
+                         index=self.cnpjs, name="Retorno")
+
+    def retornos(self, periodos):
+        """
+
+        Retorno de todos os fundos em varios periodos de uma vez
+
+        Parameters
+        ----------
+        periodos : dict ou list
+                   {nome: (data_inicio, data_fim)} ou lista de (data_inicio, data_fim)
+
+        Returns
+        -------
+        Pandas DataFrame com CNPJ_FUNDO no index e um periodo por coluna
+
+        """
+
+        if not isinstance(periodos, dict):
+            periodos = {"{} a {}".format(inicio, fim): (inicio, fim) for inicio, fim in periodos}
+
+        inicios = np.array([self._linha(inicio) for inicio, _ in periodos.values()], dtype=np.int64)
+        fins = np.array([self._linha(fim) for _, fim in periodos.values()], dtype=np.int64)
+        validos = (inicios >= 0) & (fins >= 0)
+
+        retornos = np.full((len(self.chaves), len(periodos)), np.nan)
+        retornos[:, validos] = np.expm1(self.log_quotas[fins[validos]]
+                                        - self.log_quotas[inicios[validos]]).T
+        return pd.DataFrame(retornos, index=self.cnpjs, columns=list(periodos))
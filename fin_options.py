@@ -7,6 +7,9 @@ from datetime import datetime
 from streamlit_extras.metric_cards import style_metric_cards
 from streamlit_extras.grid import grid
 
+from fin_cvm import carrega_cadastro
+from fin_indices import IndiceNomes
+
 
 def build_sidebar():
     st.image("images/logo-250-100-transparente.png")
@@ -27,6 +30,22 @@ def build_sidebar():
         return tickers, prices
     return None, None
 
+@st.cache_resource
+def load_fund_names():
+    cadastro = carrega_cadastro(["DENOM_SOCIAL", "CLASSE", "ADMIN", "GESTOR"], ativos=True)
+    return cadastro, IndiceNomes(cadastro)
+
+
+def build_fund_search():
+    query = st.text_input("Buscar fundo", placeholder="Nome, administrador ou gestor")
+    if not query:
+        return
+    cadastro, names = load_fund_names()
+    found = names.busca(query)
+    if not found:
+        found = list(names.aproximada(query).index)
+    st.dataframe(cadastro.loc[found[:100], ["DENOM_SOCIAL", "CLASSE", "GESTOR"]])
+
 def build_main(tickers, prices):
     weights = np.ones(len(tickers))/len(tickers)
     prices['portfolio'] = prices.drop("IBOV", axis=1) @ weights
@@ -82,6 +101,7 @@ st.set_page_config(layout="wide")
 
 with st.sidebar:
     tickers, prices = build_sidebar()
+    build_fund_search()
 
 st.title('Python para Investidores')
 if tickers:
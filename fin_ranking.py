@@ -0,0 +1,671 @@
+"""
+
+Classificacao dos fundos pelo retorno no periodo
+
+O retorno de cada fundo e calculado entre a primeira e a ultima quota valida
+do fundo no periodo (com o minimo de cotistas), sem montar a tabela larga
+datas x fundos. Assim fundos que iniciaram ou encerraram no meio do periodo
+tambem sao classificados:
+
+    retorno = quota final / quota inicial - 1
+
+As metricas de risco (volatilidade, Sharpe e Sortino contra o CDI, drawdown
+maximo e Calmar) sao calculadas para todos os fundos de uma vez com operacoes
+nas colunas da matriz datas x fundos.
+
+Os retornos de um universo (versao dos dados, periodo, classe e minimo de
+cotistas) ficam memorizados, assim os melhores e os piores do mesmo universo
+sao calculados uma vez so, e a selecao dos extremos e parcial (argpartition).
+
+"""
+
+import hashlib
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from fin_indices import chave_para_cnpj, chaves_cnpj
+
+COLUNAS_RETORNOS = ["Quota inicial", "Quota final", "Inicio", "Fim", "Retorno"]
+
+# colunas do cadastro nas tabelas de classificacao
+COLUNAS_CADASTRO = {"DENOM_SOCIAL": "Nome", "TP_FUNDO": "Tipo",
+                    "CLASSE": "Classe", "VL_PATRIM_LIQ": "PL"}
+
+# metricas de risco: True quando o maior valor e o melhor
+METRICAS = {"Retorno": True, "Retorno anual": True, "Volatilidade": False,
+            "Sharpe": True, "Sortino": True, "Drawdown maximo": True, "Calmar": True}
+
+DIAS_UTEIS = 252
+
+# quantidade de universos memorizados
+TAMANHO_MEMORIA = 32
+
+_memoria = OrderedDict()
+
+
+# funcoes de retorno no periodo
+
+def _quadro_retornos(chaves, quota_inicial, quota_final, inicio, fim):
+    return pd.DataFrame({"Quota inicial": quota_inicial,
+                         "Quota final": quota_final,
+                         "Inicio": pd.DatetimeIndex(inicio),
+                         "Fim": pd.DatetimeIndex(fim),
+                         "Retorno": quota_final / quota_inicial - 1},
+                        index=pd.Index([chave_para_cnpj(chave) for chave in chaves],
+                                       name="CNPJ_FUNDO"))
+
+
+def retornos_periodo(informes, minimo_cotista=0, data_inicio=None, data_fim=None):
+    """
+
+    Retorno de cada fundo entre a primeira e a ultima quota valida, por uma
+    ordenacao (CNPJ, data) dos informes
+
+    Parameters
+    ----------
+    informes : DataFrame
+               informes diarios com CNPJ_FUNDO, DT_COMPTC, VL_QUOTA e NR_COTST
+
+    minimo_cotista : int
+                     considera somente os dias com o minimo numero de cotista
+
+    data_inicio : data
+                  YYYY-MM-DD, se None desde o primeiro informe
+
+    data_fim : data
+               YYYY-MM-DD, se None ate o ultimo informe
+
+    Returns
+    -------
+    Pandas DataFrame com CNPJ_FUNDO no index e as colunas COLUNAS_RETORNOS
+
+    """
+
+    datas = informes["DT_COMPTC"].to_numpy()
+    quotas = informes["VL_QUOTA"].to_numpy(dtype=np.float64)
+
+    validas = ~np.isnan(quotas) & (quotas > 0)
+    if minimo_cotista:
+        validas &= informes["NR_COTST"].to_numpy(dtype=np.float64) >= minimo_cotista
+    if data_inicio is not None:
+        validas &= datas >= np.datetime64(pd.Timestamp(data_inicio))
+    if data_fim is not None:
+        validas &= datas <= np.datetime64(pd.Timestamp(data_fim))
+
+    linhas = np.flatnonzero(validas)
+    if not len(linhas):
+        return pd.DataFrame(columns=COLUNAS_RETORNOS)
+    chaves = chaves_cnpj(informes["CNPJ_FUNDO"])[linhas]
+    datas = datas[linhas]
+    ordem = np.lexsort((datas, chaves))
+    chaves, datas, quotas = chaves[ordem], datas[ordem], quotas[linhas[ordem]]
+
+    # primeira e ultima linha de cada fundo na ordenacao
+    primeiras = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+    ultimas = np.r_[primeiras[1:], len(chaves)] - 1
+
+    return _quadro_retornos(chaves[primeiras],
+                            quotas[primeiras], quotas[ultimas],
+                            datas[primeiras], datas[ultimas])
+
+
+def retornos_matriz(matriz, minimo_cotista=0, colunas=None, data_inicio=None, data_fim=None):
+    """
+
+    Retorno de cada fundo entre a primeira e a ultima quota valida da matriz
+    datas x fundos
+
+    Parameters
+    ----------
+    matriz : MatrizQuotas
+             matriz com 'quotas' e 'cotistas'
+
+    minimo_cotista : int
+                     considera somente os dias com o minimo numero de cotista
+
+    colunas : numpy array
+              colunas dos fundos desejados (ver MatrizQuotas.posicoes), se None
+              todos os fundos
+
+    data_inicio : data
+                  YYYY-MM-DD, se None desde a primeira data da matriz
+
+    data_fim : data
+               YYYY-MM-DD, se None ate a ultima data da matriz
+
+    Returns
+    -------
+    Pandas DataFrame com CNPJ_FUNDO no index e as colunas COLUNAS_RETORNOS
+
+    """
+
+    inicio = 0 if data_inicio is None \
+        else np.searchsorted(matriz.datas, np.datetime64(pd.Timestamp(data_inicio)))
+    fim = len(matriz.datas) if data_fim is None \
+        else np.searchsorted(matriz.datas, np.datetime64(pd.Timestamp(data_fim)), side="right")
+    colunas = slice(None) if colunas is None else colunas
+
+    quotas = matriz.matrizes["quotas"][inicio:fim, colunas]
+    datas = matriz.datas[inicio:fim]
+    chaves = matriz.chaves[colunas]
+
+    validas = ~np.isnan(quotas) & (quotas > 0)
+    if minimo_cotista:
+        validas &= matriz.matrizes["cotistas"][inicio:fim, colunas] >= minimo_cotista
+
+    com_quota = validas.any(axis=0)
+    validas = validas[:, com_quota]
+    quotas = quotas[:, com_quota]
+    primeiras = validas.argmax(axis=0)
+    ultimas = len(datas) - 1 - validas[::-1].argmax(axis=0)
+
+    fundos = np.arange(quotas.shape[1])
+    return _quadro_retornos(chaves[com_quota],
+                            quotas[primeiras, fundos], quotas[ultimas, fundos],
+                            datas[primeiras], datas[ultimas])
+
+
+# funcoes das metricas de risco
+
+def preenche_quotas(quotas):
+    """
+
+    Repete a ultima quota valida nos dias sem informe, somente dentro da vida
+    de cada fundo (entre a primeira e a ultima quota valida)
+
+    Parameters
+    ----------
+    quotas : numpy array
+             matriz datas x fundos com NaN nos dias sem quota
+
+    Returns
+    -------
+    numpy array datas x fundos preenchida
+
+    """
+
+    validas = ~np.isnan(quotas)
+    datas = np.arange(len(quotas))[:, np.newaxis]
+    ultima_valida = np.maximum.accumulate(np.where(validas, datas, 0), axis=0)
+    preenchidas = np.take_along_axis(quotas, ultima_valida, axis=0)
+
+    # depois da ultima quota do fundo (encerrado) nao ha retorno
+    ultimas = len(quotas) - 1 - validas[::-1].argmax(axis=0)
+    preenchidas[datas > ultimas] = np.nan
+    return preenchidas
+
+
+def _taxa_diaria(cdi, datas):
+    """ taxa diaria do CDI (% ao dia) alinhada as datas, zero sem cotacao """
+
+    if cdi is None:
+        return np.zeros(len(datas))
+    if isinstance(cdi, pd.DataFrame):
+        cdi = cdi.iloc[:, 0]
+    cdi = pd.to_numeric(cdi, errors="coerce").sort_index()
+    taxa = cdi.reindex(pd.DatetimeIndex(datas), method="ffill").fillna(0) / 100
+    return taxa.to_numpy()
+
+
+def metricas_risco(matriz, cdi=None, minimo_cotista=0, colunas=None, data_inicio=None,
+                   data_fim=None, dias_ano=DIAS_UTEIS):
+    """
+
+    Metricas de risco de todos os fundos da matriz datas x fundos
+
+    Parameters
+    ----------
+    matriz : MatrizQuotas
+             matriz com 'quotas' e 'cotistas'
+
+    cdi : DataFrame ou Series
+          CDI diario em % ao dia com as datas no index (consulta_bcb(12)), se
+          None o Sharpe e o Sortino sao calculados com taxa zero
+
+    minimo_cotista : int
+                     considera somente os dias com o minimo numero de cotista
+
+    colunas : numpy array
+              colunas dos fundos desejados (ver MatrizQuotas.posicoes), se None
+              todos os fundos
+
+    data_inicio : data
+                  YYYY-MM-DD, se None desde a primeira data da matriz
+
+    data_fim : data
+               YYYY-MM-DD, se None ate a ultima data da matriz
+
+    dias_ano : int
+               dias uteis no ano para anualizar
+
+    Returns
+    -------
+    Pandas DataFrame com CNPJ_FUNDO no index e as colunas METRICAS (fundos
+    com pelo menos dois retornos diarios)
+
+    """
+
+    inicio = 0 if data_inicio is None \
+        else np.searchsorted(matriz.datas, np.datetime64(pd.Timestamp(data_inicio)))
+    fim = len(matriz.datas) if data_fim is None \
+        else np.searchsorted(matriz.datas, np.datetime64(pd.Timestamp(data_fim)), side="right")
+    colunas = slice(None) if colunas is None else colunas
+
+    quotas = np.array(matriz.matrizes["quotas"][inicio:fim, colunas], dtype=np.float64)
+    quotas[~(quotas > 0)] = np.nan
+    if minimo_cotista:
+        quotas[~(matriz.matrizes["cotistas"][inicio:fim, colunas] >= minimo_cotista)] = np.nan
+    datas = matriz.datas[inicio:fim]
+    chaves = matriz.chaves[colunas]
+
+    com_retornos = (~np.isnan(quotas)).sum(axis=0) >= 2
+    quotas, chaves = quotas[:, com_retornos], chaves[com_retornos]
+    if not len(chaves):
+        return pd.DataFrame(columns=list(METRICAS))
+
+    # retorno de cada quota valida contra a quota valida anterior do proprio
+    # fundo, os dias sem informe do fundo nao sao retornos (nem pagam CDI)
+    anteriores = preenche_quotas(quotas)[:-1]
+    retornos = quotas[1:] / anteriores - 1
+    excesso = retornos - _taxa_diaria(cdi, datas)[1:, np.newaxis]
+    dias = (~np.isnan(retornos)).sum(axis=0)
+
+    # fundos com um unico retorno ficam sem desvio (NaN)
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        primeiras = np.argmax(~np.isnan(quotas), axis=0)
+        ultimas = len(quotas) - 1 - np.argmax(~np.isnan(quotas[::-1]), axis=0)
+        fundos = np.arange(quotas.shape[1])
+        retorno = quotas[ultimas, fundos] / quotas[primeiras, fundos] - 1
+        retorno_anual = (1 + retorno) ** (dias_ano / dias) - 1
+
+        volatilidade = np.nanstd(retornos, axis=0, ddof=1) * np.sqrt(dias_ano)
+        media_excesso = np.nanmean(excesso, axis=0) * dias_ano
+        sharpe = media_excesso / (np.nanstd(excesso, axis=0, ddof=1) * np.sqrt(dias_ano))
+        queda = np.sqrt(np.nanmean(np.minimum(excesso, 0) ** 2, axis=0) * dias_ano)
+        sortino = media_excesso / queda
+
+        drawdown = np.nanmin(quotas / np.fmax.accumulate(quotas, axis=0) - 1, axis=0)
+        calmar = retorno_anual / np.abs(drawdown)
+
+    metricas = pd.DataFrame({"Retorno": retorno, "Retorno anual": retorno_anual,
+                             "Volatilidade": volatilidade, "Sharpe": sharpe,
+                             "Sortino": sortino, "Drawdown maximo": drawdown,
+                             "Calmar": calmar},
+                            index=pd.Index([chave_para_cnpj(chave) for chave in chaves],
+                                           name="CNPJ_FUNDO"))
+    return metricas.replace([np.inf, -np.inf], np.nan)
+
+
+# funcoes das tabelas de classificacao
+
+def junta_cadastro(selecao, cadastro):
+    """
+
+    Acrescenta Nome, Tipo, Classe e PL do cadastro em uma unica juncao
+
+    Parameters
+    ----------
+    selecao : DataFrame
+              fundos com CNPJ_FUNDO no index
+
+    cadastro : DataFrame
+               cadastro dos fundos com CNPJ_FUNDO no index
+
+    Returns
+    -------
+    Pandas DataFrame selecao com as colunas do cadastro
+
+    """
+
+    return selecao.join(cadastro[list(COLUNAS_CADASTRO)].rename(columns=COLUNAS_CADASTRO))
+
+
+def classifica_todos(retornos, cadastro, num_ranking=100, grupos=("CLASSE", "TP_FUNDO")):
+    """
+
+    Melhores e piores fundos de todas as classes de uma vez, a partir do
+    retorno de cada fundo calculado uma unica vez
+
+    Parameters
+    ----------
+    retornos : DataFrame
+               retorno dos fundos, ver retornos_periodo ou retornos_matriz
+
+    cadastro : DataFrame
+               cadastro dos fundos com CNPJ_FUNDO no index e as colunas grupos
+
+    num_ranking : int
+                  quantidade de fundos de cada tabela, se 0 todos os fundos
+
+    grupos : tuple
+             colunas do cadastro usadas no agrupamento
+
+    Returns
+    -------
+    Pandas DataFrame com index (Grupo, Valor, Classificacao, Rank), ex.:
+    relatorio.loc[('CLASSE', 'Fundo de Ações', 'melhores')]
+
+    """
+
+    tabela = junta_cadastro(pd.DataFrame(
+        {"Retorno(%)": round(retornos["Retorno"] * 100, 2),
+         "Retorno": retornos["Retorno"]}), cadastro)
+
+    partes = []
+    for grupo in grupos:
+        tabela["Valor"] = cadastro[grupo].reindex(tabela.index)
+        por_grupo = tabela.dropna(subset=["Valor"])
+        for classificacao, ascendente in (("melhores", False), ("piores", True)):
+            ordem = por_grupo.sort_values(["Valor", "Retorno"], ascending=[True, ascendente],
+                                          kind="stable")
+            if num_ranking:
+                ordem = ordem.groupby("Valor", sort=False, observed=True).head(num_ranking)
+            partes.append(ordem.assign(
+                Grupo=grupo, Classificacao=classificacao,
+                Rank=ordem.groupby("Valor", sort=False, observed=True).cumcount().to_numpy() + 1))
+
+    if not partes:
+        return pd.DataFrame()
+    relatorio = pd.concat(partes).rename_axis("CNPJ_FUNDO").reset_index()
+    return relatorio.set_index(["Grupo", "Valor", "Classificacao", "Rank"]).sort_index()[
+        ["CNPJ_FUNDO", "Retorno(%)", *COLUNAS_CADASTRO.values()]]
+
+
+# funcoes de selecao e memoria
+
+def extremos(serie, num, maiores=True):
+    """
+
+    Maiores ou menores valores de uma serie por selecao parcial, somente os
+    selecionados sao ordenados
+
+    Parameters
+    ----------
+    serie : Series
+            valores (ex.: coluna Retorno de retornos_periodo), NaN sao descartados
+
+    num : int
+          quantidade de valores, se 0 todos
+
+    maiores : bool
+              True para os maiores (melhores), False para os menores (piores)
+
+    Returns
+    -------
+    Pandas Series com os valores selecionados em ordem
+
+    """
+
+    serie = serie.dropna()
+    valores = serie.to_numpy()
+    if maiores:
+        valores = -valores
+    if 0 < num < len(valores):
+        posicoes = np.sort(np.argpartition(valores, num - 1)[:num])
+    else:
+        posicoes = np.arange(len(valores))
+    posicoes = posicoes[np.argsort(valores[posicoes], kind="stable")]
+    return serie.iloc[posicoes]
+
+
+def memoriza(chave, calcula):
+    """
+
+    Resultado memorizado de calcula() para a chave, descartando os usados ha
+    mais tempo alem de TAMANHO_MEMORIA
+
+    Parameters
+    ----------
+    chave : tuple
+            (versao dos dados, data_inicio, data_fim, classe, minimo_cotista)
+
+    calcula : function
+              funcao sem parametros chamada somente se a chave nao esta memorizada
+
+    Returns
+    -------
+    resultado de calcula()
+
+    """
+
+    if chave in _memoria:
+        _memoria.move_to_end(chave)
+        return _memoria[chave]
+
+    resultado = calcula()
+    _memoria[chave] = resultado
+    while len(_memoria) > TAMANHO_MEMORIA:
+        _memoria.popitem(last=False)
+    return resultado
+
+
+def limpa_memoria():
+    """ descarta os retornos memorizados """
+
+    _memoria.clear()
+
+
+def versao_serie(serie):
+    """
+
+    Hash do conteudo (index e valores) de uma serie para a chave da memoria,
+    muda quando a serie e recarregada ou alterada
+
+    Parameters
+    ----------
+    serie : DataFrame ou Series
+            serie usada no calculo (ex.: CDI diario), ou None
+
+    Returns
+    -------
+    string com o hash, None se a serie e None
+
+    """
+
+    if serie is None:
+        return None
+    resumo = hashlib.sha256(pd.util.hash_pandas_object(serie, index=True).to_numpy().tobytes())
+    if isinstance(serie, pd.DataFrame):
+        resumo.update(repr(list(serie.columns)).encode())
+    return resumo.hexdigest()[:16]
+
+
+# estado incremental da classificacao
+
+class EstadoClassificacao:
+    """
+
+    Estado por fundo (primeira e ultima quota, momentos dos retornos diarios e
+    drawdown) atualizado somente com os informes novos
+
+    A CVM republica o arquivo do mes aberto todos os dias com um dia a mais,
+    as linhas ja processadas de cada fundo (data ate a ultima quota do estado)
+    sao ignoradas, assim a atualizacao diaria custa somente os dias novos.
+
+    Parameters
+    ----------
+    minimo_cotista : int
+                     considera somente os dias com o minimo numero de cotista
+
+    cdi : DataFrame ou Series
+          CDI diario em % ao dia (consulta_bcb(12)) usado no Sharpe e no
+          Sortino, se None taxa zero
+
+    Attributes
+    ----------
+    estado : DataFrame
+             uma linha por fundo (index chave inteira do CNPJ)
+
+    """
+
+    COLUNAS = ["Inicio", "Quota inicial", "Fim", "Quota final", "Dias", "Soma",
+               "Soma quadrados", "Soma excesso", "Soma quadrados excesso",
+               "Soma queda", "Maximo", "Drawdown maximo"]
+
+    def __init__(self, minimo_cotista=0, cdi=None):
+        self.minimo_cotista = minimo_cotista
+        self.cdi = cdi
+        self.estado = pd.DataFrame(
+            {coluna: pd.Series(dtype="datetime64[ns]" if coluna in ("Inicio", "Fim")
+                               else np.float64) for coluna in self.COLUNAS},
+            index=pd.Index([], dtype=np.int64, name="CHAVE_CNPJ"))
+
+    def __len__(self):
+        return len(self.estado)
+
+    def atualiza(self, informes):
+        """
+
+        Atualiza o estado com os informes novos (ou o mes republicado inteiro)
+
+        Parameters
+        ----------
+        informes : DataFrame
+                   informes diarios com CNPJ_FUNDO, DT_COMPTC, VL_QUOTA e NR_COTST
+
+        Returns
+        -------
+        int com a quantidade de linhas novas processadas
+
+        """
+
+        quotas = informes["VL_QUOTA"].to_numpy(dtype=np.float64)
+        validas = quotas > 0
+        if self.minimo_cotista:
+            validas &= informes["NR_COTST"].to_numpy(dtype=np.float64) >= self.minimo_cotista
+        linhas = np.flatnonzero(validas)
+
+        novos = pd.DataFrame({"chave": chaves_cnpj(informes["CNPJ_FUNDO"])[linhas],
+                              "data": informes["DT_COMPTC"].to_numpy()[linhas],
+                              "quota": quotas[linhas]})
+
+        # somente as datas depois da ultima quota de cada fundo
+        fim = self.estado["Fim"].reindex(novos["chave"]).to_numpy()
+        novos = novos[~(novos["data"].to_numpy() <= fim)]
+        novos = novos.drop_duplicates(["chave", "data"], keep="last") \
+            .sort_values(["chave", "data"], kind="stable").reset_index(drop=True)
+        if novos.empty:
+            return 0
+
+        # retorno de cada dia, o primeiro dia novo contra a ultima quota do estado
+        chaves = novos["chave"].to_numpy()
+        quota = novos["quota"].to_numpy()
+        mesmo_fundo = np.r_[False, chaves[1:] == chaves[:-1]]
+        anterior = np.where(mesmo_fundo, np.r_[np.nan, quota[:-1]],
+                            self.estado["Quota final"].reindex(chaves).to_numpy())
+        retorno = quota / anterior - 1
+        excesso = retorno - _taxa_diaria(self.cdi, novos["data"].to_numpy())
+
+        maximo = np.fmax(novos.groupby("chave", sort=False)["quota"].cummax().to_numpy(),
+                         self.estado["Maximo"].reindex(chaves).to_numpy())
+        novos = novos.assign(
+            dia=~np.isnan(retorno), soma=np.nan_to_num(retorno),
+            soma_quadrados=np.nan_to_num(retorno) ** 2, soma_excesso=np.nan_to_num(excesso),
+            soma_quadrados_excesso=np.nan_to_num(excesso) ** 2,
+            soma_queda=np.minimum(np.nan_to_num(excesso), 0) ** 2,
+            maximo=maximo, drawdown=quota / maximo - 1)
+
+        grupos = novos.groupby("chave", sort=False)
+        soma = grupos[["dia", "soma", "soma_quadrados", "soma_excesso",
+                       "soma_quadrados_excesso", "soma_queda"]].sum()
+        primeiros = grupos[["data", "quota"]].first()
+        ultimos = grupos[["data", "quota", "maximo"]].last()
+        drawdown = grupos["drawdown"].min()
+
+        # combina com o estado anterior (fundos novos entram com a primeira quota)
+        estado = self.estado.reindex(self.estado.index.union(soma.index))
+        atualizados = soma.index
+        anteriores = estado.loc[atualizados]
+        inicio_novo = anteriores["Inicio"].isna()
+
+        estado.loc[atualizados, "Inicio"] = anteriores["Inicio"].where(
+            ~inicio_novo, primeiros["data"])
+        estado.loc[atualizados, "Quota inicial"] = anteriores["Quota inicial"].where(
+            ~inicio_novo, primeiros["quota"])
+        estado.loc[atualizados, "Fim"] = ultimos["data"]
+        estado.loc[atualizados, "Quota final"] = ultimos["quota"]
+        estado.loc[atualizados, "Maximo"] = ultimos["maximo"]
+        estado.loc[atualizados, "Drawdown maximo"] = np.fmin(
+            anteriores["Drawdown maximo"], drawdown)
+        for coluna, parcial in (("Dias", "dia"), ("Soma", "soma"),
+                                ("Soma quadrados", "soma_quadrados"),
+                                ("Soma excesso", "soma_excesso"),
+                                ("Soma quadrados excesso", "soma_quadrados_excesso"),
+                                ("Soma queda", "soma_queda")):
+            estado.loc[atualizados, coluna] = anteriores[coluna].fillna(0) + soma[parcial]
+
+        self.estado = estado
+        return len(novos)
+
+    def metricas(self, dias_ano=DIAS_UTEIS):
+        """
+
+        Retornos e metricas de risco de todos os fundos a partir do estado
+
+        Returns
+        -------
+        Pandas DataFrame com CNPJ_FUNDO no index, as colunas COLUNAS_RETORNOS
+        e as METRICAS (ver metricas_risco)
+
+        """
+
+        estado = self.estado
+        dias = estado["Dias"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            retorno = estado["Quota final"] / estado["Quota inicial"] - 1
+            retorno_anual = (1 + retorno) ** (dias_ano / dias) - 1
+            variancia = (estado["Soma quadrados"] - estado["Soma"] ** 2 / dias) / (dias - 1)
+            variancia_excesso = (estado["Soma quadrados excesso"]
+                                 - estado["Soma excesso"] ** 2 / dias) / (dias - 1)
+            media_excesso = estado["Soma excesso"] / dias * dias_ano
+            metricas = pd.DataFrame({
+                "Quota inicial": estado["Quota inicial"], "Quota final": estado["Quota final"],
+                "Inicio": estado["Inicio"], "Fim": estado["Fim"], "Retorno": retorno,
+                "Retorno anual": retorno_anual,
+                "Volatilidade": np.sqrt(variancia.clip(lower=0) * dias_ano),
+                "Sharpe": media_excesso / np.sqrt(variancia_excesso.clip(lower=0) * dias_ano),
+                "Sortino": media_excesso / np.sqrt(estado["Soma queda"] / dias * dias_ano),
+                "Drawdown maximo": estado["Drawdown maximo"],
+                "Calmar": retorno_anual / estado["Drawdown maximo"].abs()})
+
+        metricas.index = pd.Index([chave_para_cnpj(chave) for chave in estado.index],
+                                  name="CNPJ_FUNDO")
+        return metricas.replace([np.inf, -np.inf], np.nan)
+
+    def classifica(self, classificacao="melhores", num_ranking=0, metrica="Retorno"):
+        """
+
+        Classificacao dos fundos a partir do estado atual
+
+        Parameters
+        ----------
+        classificacao : string
+                        'melhores' ou 'piores'
+
+        num_ranking : int
+                      quantidade de fundos, se 0 todos os fundos
+
+        metrica : string
+                  uma das METRICAS
+
+        Returns
+        -------
+        Pandas DataFrame com Rank, Retorno(%) e a metrica (ver junta_cadastro
+        para acrescentar o cadastro)
+
+        """
+
+        metricas = self.metricas()
+        maiores = METRICAS[metrica] if classificacao == "melhores" else not METRICAS[metrica]
+        selecionados = extremos(metricas[metrica], num_ranking, maiores)
+
+        selecao = pd.DataFrame({"Rank": np.arange(1, len(selecionados) + 1)},
+                               index=selecionados.index)
+        selecao["Retorno(%)"] = round(metricas.loc[selecionados.index, "Retorno"] * 100, 2)
+        if metrica != "Retorno":
+            selecao[metrica] = round(selecionados, 4)
+        return selecao
@@ -0,0 +1,207 @@
+"""
+
+Calculo vetorizado de retornos compostos
+
+A classe Retornos recebe a serie de valores (quotas, precos) ou de taxas em %
+uma unica vez e guarda o log dos retornos diarios. Os retornos diarios,
+mensais, trimestrais, anuais e acumulados saem desse mesmo intermediario em
+precisao total; o arredondamento e feito somente na apresentacao.
+
+Os retornos de cada periodo (mes, trimestre, ano) sao compostos somando o log
+dos retornos diarios de todas as colunas de uma vez, sem funcao Python por
+coluna e por periodo:
+
+    retorno do periodo = exp(soma(log(1 + r))) - 1 = prod(1 + r) - 1
+
+Dias sem retorno (NaN) nao alteram o periodo, como no prod() do pandas.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# frequencias dos retornos por periodo e formato das datas na apresentacao
+FREQUENCIAS = {"D": None, "M": "%Y-%m", "Q": None, "A": "%Y"}
+
+
+# funcoes composicao dos retornos por periodo
+
+def soma_log(log_retornos, frequencia="M"):
+    """
+
+    Soma do log dos retornos diarios em cada periodo, nucleo da composicao
+    usado por compoe_retornos e pela classe Retornos
+
+    Parameters
+    ----------
+    log_retornos : DataFrame
+                   log(1 + r) dos retornos diarios com datetime no index
+
+    frequencia : string
+                 frequencia do resample ('M' mensal, 'Q' trimestral, 'A' anual)
+
+    Returns
+    -------
+    Pandas DataFrame com o log do retorno de cada periodo (index no fim do
+    periodo)
+
+    """
+
+    return log_retornos.resample(frequencia).sum()
+
+
+def compoe_retornos(retornos, frequencia="M"):
+    """
+
+    Compoe retornos diarios em retornos por periodo
+
+    Parameters
+    ----------
+    retornos : DataFrame
+               retornos diarios (0.01 = 1%) com datetime no index
+
+    frequencia : string
+                 frequencia do resample ('M' mensal, 'Q' trimestral, 'A' anual)
+
+    Returns
+    -------
+    Pandas DataFrame com o retorno composto de cada periodo (index no fim do
+    periodo)
+
+    """
+
+    return np.expm1(soma_log(np.log1p(retornos), frequencia))
+
+
+# motor de retornos
+
+class Retornos:
+    """
+
+    Retornos de uma serie de valores ou de taxas a partir de um unico
+    intermediario (log dos retornos diarios)
+
+    Parameters
+    ----------
+    df : DataFrame
+         datetime no index e uma coluna por ativo (valores ou taxas em %)
+
+    data_inicio : data
+                  YYYY-MM-DD, o dia anterior tambem e lido para o primeiro retorno
+
+    data_fim : data
+               YYYY-MM-DD
+
+    pct : bool
+          True quando df tem taxas diarias em % (ex.: CDI), False para valores
+
+    Attributes
+    ----------
+    serie : DataFrame
+            df no periodo (incluindo o dia anterior a data_inicio)
+
+    diarios : DataFrame
+              retornos diarios (0.01 = 1%) em precisao total
+
+    """
+
+    def __init__(self, df, data_inicio, data_fim, pct=False):
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+
+        # tratamento das datas incluido o dia anterior para calculo de retornos
+        data_inicial = pd.to_datetime(data_inicio) - pd.DateOffset(days=1)
+        self.serie = df.loc[data_inicial.strftime("%Y-%m-%d"):data_fim]
+
+        self.diarios = self.serie / 100 if pct else self.serie.pct_change()
+        self._log = np.log1p(self.diarios)
+        self._periodos = {}
+
+    def _no_periodo(self, df):
+        return df[self.data_inicio:self.data_fim]
+
+    def _log_periodo(self, frequencia):
+        if frequencia == "D":
+            return self._log
+        if frequencia not in self._periodos:
+            self._periodos[frequencia] = soma_log(self._log, frequencia)
+        return self._periodos[frequencia]
+
+    def periodicos(self, frequencia="D"):
+        """
+
+        Retorno de cada dia ou periodo
+
+        Parameters
+        ----------
+        frequencia : string
+                     'D' diario, 'M' mensal, 'Q' trimestral ou 'A' anual
+
+        Returns
+        -------
+        Pandas DataFrame com os retornos (0.01 = 1%) entre data_inicio e data_fim
+
+        """
+
+        if frequencia == "D":
+            return self._no_periodo(self.diarios)
+        return self._no_periodo(np.expm1(self._log_periodo(frequencia)))
+
+    def acumulados(self, frequencia="D"):
+        """
+
+        Retorno acumulado desde o inicio ate cada dia ou periodo
+
+        Parameters
+        ----------
+        frequencia : string
+                     'D' diario, 'M' mensal, 'Q' trimestral ou 'A' anual
+
+        Returns
+        -------
+        Pandas DataFrame com os retornos acumulados (0.01 = 1%)
+
+        """
+
+        return self._no_periodo(np.expm1(self._log_periodo(frequencia).cumsum()))
+
+    def total(self):
+        """
+
+        Retorno de todo o periodo
+
+        Returns
+        -------
+        Pandas Series com o retorno de cada coluna
+
+        """
+
+        return np.expm1(self._log.sum())
+
+
+def apresenta(df, frequencia="D", casas=2):
+    """
+
+    Retornos em % arredondados, com as datas no formato da frequencia
+
+    Parameters
+    ----------
+    df : DataFrame
+         retornos (0.01 = 1%)
+
+    frequencia : string
+                 frequencia dos retornos, ver FREQUENCIAS
+
+    casas : int
+            casas decimais
+
+    Returns
+    -------
+    Pandas DataFrame com os retornos em %
+
+    """
+
+    df = round(df * 100, casas)
+    if FREQUENCIAS.get(frequencia):
+        df.index = df.index.strftime(FREQUENCIAS[frequencia])
+    return df